@@ -18,6 +18,7 @@ setup(
     keywords = "vyos",
     url = "http://www.vyos.io",
     packages = packages('vyos'),
+    package_data = {'vyos.xml.cache': ['*.pickle']},
     long_description="VyOS configuration libraries",
     classifiers=[
         "Development Status :: 4 - Beta",
@@ -65,11 +65,11 @@ In operational mode, all functions return values from the running config.
 
 import re
 import json
-from copy import deepcopy
 
 import vyos.xml
 import vyos.util
 import vyos.configtree
+from vyos.dicts import CopyOnWriteDict
 from vyos.configsource import ConfigSource, ConfigSourceSession
 
 class Config(object):
@@ -90,8 +90,14 @@ class Config(object):
 
         self._level = []
         self._dict_cache = {}
-        (self._running_config,
-         self._session_config) = self._config_source.get_configtree_tuple()
+
+    @property
+    def _running_config(self):
+        return self._config_source.get_configtree(effective=True)
+
+    @property
+    def _session_config(self):
+        return self._config_source.get_configtree()
 
     def _make_path(self, path):
         # Backwards-compatibility stuff: original implementation used string paths
@@ -199,13 +205,9 @@ class Config(object):
         if cached:
             return cached
 
-        if effective:
-            config = self._running_config
-        else:
-            config = self._session_config
-
-        if config:
-            config_dict = json.loads(config.to_json())
+        config_json = self._config_source.get_config_json(effective)
+        if config_json:
+            config_dict = json.loads(config_json)
         else:
             config_dict = {}
 
@@ -230,7 +232,8 @@ class Config(object):
         conf_dict = vyos.util.get_sub_dict(root_dict, lpath, get_first_key)
 
         if not key_mangling and no_multi_convert:
-            return deepcopy(conf_dict)
+            # the cached root dict must not be altered by the caller
+            return CopyOnWriteDict(conf_dict)
 
         xmlpath = lpath if get_first_key else lpath[:-1]
 
@@ -251,6 +254,32 @@ class Config(object):
 
         return conf_dict
 
+    def bulk_query(self, queries, effective=False):
+        """
+        Answer many path queries at once from the cached dict representation
+        of the config, instead of crossing into libvyosconfig for each of them
+
+        Args:
+            queries (list): (op, path) tuples, where op is one of 'exists',
+                'return_value', 'return_values' or 'list_nodes'
+            effective=False: effective or session config
+
+        Returns:
+            list: results in query order; None for non-existent paths
+            (False for 'exists')
+        """
+        root_dict = self.get_cached_root_dict(effective)
+        results = []
+        for op, path in queries:
+            lpath = self._make_path(path)
+            res = vyos.configtree.query_dict(root_dict, op, lpath)
+            if op == 'exists' and not res and lpath:
+                # same value emulation as in exists()
+                value = vyos.configtree.query_dict(root_dict, 'return_value', lpath[:-1])
+                res = (value == lpath[-1])
+            results.append(res)
+        return results
+
     def is_multi(self, path):
         """
         Args:
@@ -0,0 +1,79 @@
+# Copyright 2020 VyOS maintainers and contributors <maintainers@vyos.io>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+A content-addressed cache of parsed config trees, shared between processes.
+
+Every config script of a commit reads the same running and proposed config
+texts and used to parse them with libvyosconfig from scratch. The JSON form
+of a parsed tree is stored under /run, keyed by the hash of the config text,
+so that later readers of an identical text can skip parsing altogether.
+"""
+
+import os
+import hashlib
+import tempfile
+
+from vyos.defaults import directories
+
+# number of cached config trees kept around; one commit needs two of them
+max_entries = 8
+
+def _cache_file(config_text):
+    digest = hashlib.sha256(config_text.encode()).hexdigest()
+    return os.path.join(directories['config_cache'], f'{digest}.json')
+
+def _prune(cache_dir):
+    entries = [os.path.join(cache_dir, f) for f in os.listdir(cache_dir)
+               if f.endswith('.json')]
+    if len(entries) <= max_entries:
+        return
+    entries.sort(key=os.path.getmtime)
+    for f in entries[:-max_entries]:
+        os.unlink(f)
+
+def _store(cache_file, config_json):
+    cache_dir = os.path.dirname(cache_file)
+    # config may contain secrets, keep it private to the writing user (root)
+    os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+    with tempfile.NamedTemporaryFile('w', dir=cache_dir, delete=False) as f:
+        f.write(config_json)
+    os.replace(f.name, cache_file)
+    _prune(cache_dir)
+
+def get_config_json(config_text, to_json):
+    """ Return the JSON representation of config_text
+
+    Args:
+        config_text (str): config in the native VyOS format
+        to_json (callable): returns the JSON representation, only called
+            if config_text is not yet cached
+
+    Returns: str
+    """
+    cache_file = _cache_file(config_text)
+    try:
+        with open(cache_file, 'r') as f:
+            return f.read()
+    except OSError:
+        pass
+
+    config_json = to_json()
+    try:
+        _store(cache_file, config_json)
+    except OSError:
+        # cache is an optimization only - e.g. not running as root
+        pass
+    return config_json
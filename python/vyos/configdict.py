@@ -21,6 +21,7 @@ import json
 
 from vyos.util import dict_search
 from vyos.xml import defaults
+from vyos.dicts import CopyOnWriteDict
 from vyos import ConfigError
 from vyos.util import cmd
 
@@ -88,15 +89,20 @@ def retrieve_config(path_hash, base_path, config):
 def dict_merge(source, destination):
     """ Merge two dictionaries. Only keys which are not present in destination
     will be copied from source, anything else will be kept untouched. Function
-    will return a new dict which has the merged key/value pairs. """
-    from copy import deepcopy
-    tmp = deepcopy(destination)
+    will return a new dict which has the merged key/value pairs. Neither
+    source nor destination are copied beyond the branches which are modified,
+    see CopyOnWriteDict. """
+    tmp = CopyOnWriteDict(destination)
 
     for key, value in source.items():
         if key not in tmp:
+            if isinstance(value, dict):
+                value = CopyOnWriteDict(value)
+            elif isinstance(value, list):
+                value = value.copy()
             tmp[key] = value
         elif isinstance(source[key], dict):
-            tmp[key] = dict_merge(source[key], tmp[key])
+            tmp[key] = dict_merge(source[key], destination[key])
 
     return tmp
 
@@ -114,6 +120,9 @@ def leaf_node_changed(conf, path):
     from vyos.configdiff import get_config_diff
     D = get_config_diff(conf, key_mangling=('-', '_'))
     D.set_level(conf.get_level())
+    if not D.is_node_changed(path):
+        return None
+
     (new, old) = D.get_value_diff(path)
     if new != old:
         if isinstance(old, str):
@@ -136,6 +145,9 @@ def node_changed(conf, path):
     from vyos.configdiff import get_config_diff, Diff
     D = get_config_diff(conf, key_mangling=('-', '_'))
     D.set_level(conf.get_level())
+    if not D.is_node_changed(path):
+        return []
+
     # get_child_nodes() will return dict_keys(), mangle this into a list with PEP448
     keys = D.get_child_nodes_diff(path, expand_nodes=Diff.DELETE)['delete'].keys()
     return list(keys)
@@ -161,6 +173,8 @@ def get_removed_vlans(conf, dict):
         dict.update({'vif_s_remove': [*keys]})
 
     for vif in dict.get('vif_s', {}).keys():
+        if not D.is_node_changed(['vif-s', vif, 'vif-c']):
+            continue
         keys = D.get_child_nodes_diff(['vif-s', vif, 'vif-c'], expand_nodes=Diff.DELETE)['delete'].keys()
         if keys:
             dict.update({'vif_s': { vif : {'vif_c_remove': [*keys]}}})
@@ -44,15 +44,116 @@ def _key_sets_from_dicts(session_dict, effective_dict):
     effective_keys = list(effective_dict)
 
     ret = {}
-    stable_keys = [k for k in session_keys if k in effective_keys]
+    # dicts provide O(1) membership tests, lists keep the key order
+    stable_keys = [k for k in session_keys if k in effective_dict]
 
     ret[enum_to_key(Diff.MERGE)] = session_keys
-    ret[enum_to_key(Diff.DELETE)] = [k for k in effective_keys if k not in stable_keys]
-    ret[enum_to_key(Diff.ADD)] = [k for k in session_keys if k not in stable_keys]
+    ret[enum_to_key(Diff.DELETE)] = [k for k in effective_keys if k not in session_dict]
+    ret[enum_to_key(Diff.ADD)] = [k for k in session_keys if k not in effective_dict]
     ret[enum_to_key(Diff.STABLE)] = stable_keys
 
     return ret
 
+class ChangeTrie(object):
+    """
+    The set of paths which differ between the session config dict and the
+    effective config dict, stored as a trie. It is built by a single walk
+    over both dicts and answers queries for any path in O(depth).
+
+    Every node of the trie is a dict of its changed children; a child is
+    either another such dict, or one of the markers ADDED, DELETED
+    (node only present in session/effective config) or CHANGED (leaf node
+    value differs).
+    """
+    ADDED = 'added'
+    DELETED = 'deleted'
+    CHANGED = 'changed'
+
+    def __init__(self, session_dict, effective_dict):
+        # None if nothing changed at all
+        self._root = self._build(session_dict, effective_dict)
+
+    def _build(self, session, effective):
+        if not isinstance(session, dict) or not isinstance(effective, dict):
+            return self.CHANGED if session != effective else None
+
+        trie = {}
+        for k, v in session.items():
+            if k not in effective:
+                trie[k] = self.ADDED
+                continue
+            sub = self._build(v, effective[k])
+            if sub is not None:
+                trie[k] = sub
+        for k in effective:
+            if k not in session:
+                trie[k] = self.DELETED
+
+        return trie or None
+
+    def _lookup(self, path):
+        node = self._root
+        for k in path:
+            if not isinstance(node, dict):
+                # changes of an added/deleted/changed node apply to all
+                # its descendants
+                return node
+            if k not in node:
+                return None
+            node = node[k]
+        return node
+
+    def changed(self, path=[]):
+        """
+        Returns: True if the node at path, or anything below it, was added,
+                 deleted or changed
+        """
+        return self._lookup(path) is not None
+
+    def added(self, path=[]):
+        """
+        Returns: True if the node at path is only present in the session config
+        """
+        return self._lookup(path) == self.ADDED
+
+    def deleted(self, path=[]):
+        """
+        Returns: True if the node at path is only present in the effective config
+        """
+        return self._lookup(path) == self.DELETED
+
+    def paths(self, path=[]):
+        """
+        Returns: list of (path, marker) tuples for all changes below path
+        """
+        ret = []
+        def walk(node, prefix):
+            if not isinstance(node, dict):
+                ret.append((prefix, node))
+                return
+            for k, v in node.items():
+                walk(v, prefix + [k])
+
+        node = self._lookup(path)
+        if node is not None:
+            walk(node, list(path))
+        return ret
+
+# The change trie is computed once per pair of (cached) config dicts, i.e.
+# once per Config instance and thus once per commit of a config script.
+_change_trie_cache = None
+
+def get_change_trie(session_dict, effective_dict):
+    global _change_trie_cache
+    if _change_trie_cache:
+        cached_session, cached_effective, trie = _change_trie_cache
+        if cached_session is session_dict and cached_effective is effective_dict:
+            return trie
+
+    trie = ChangeTrie(session_dict, effective_dict)
+    _change_trie_cache = (session_dict, effective_dict, trie)
+    return trie
+
 def _dict_from_key_set(key_set, d):
     # This will always be applied to a key_set obtained from a get_sub_dict,
     # hence there is no possibility of KeyError, as get_sub_dict guarantees
@@ -129,6 +230,18 @@ class ConfigDiff(object):
         ret = self._level.copy()
         return ret
 
+    def is_node_changed(self, path=[]):
+        """
+        Args:
+            path (str|list): config path
+
+        Returns: True if the node at path, or anything below it, differs
+                 between session and effective config
+        """
+        trie = get_change_trie(self._session_config_dict,
+                               self._effective_config_dict)
+        return trie.changed(self._make_path(path))
+
     def _mangle_dict_keys(self, config_dict):
         config_dict = mangle_dict_keys(config_dict, self._key_mangling[0],
                                                     self._key_mangling[1])
@@ -17,6 +17,8 @@ import re
 import sys
 import subprocess
 
+from functools import lru_cache
+
 from vyos.util import call
 
 CLI_SHELL_API = '/bin/cli-shell-api'
@@ -33,6 +35,7 @@ INSTALL_IMAGE = ['/opt/vyatta/sbin/install-image', '--url']
 REMOVE_IMAGE = ['/opt/vyatta/bin/vyatta-boot-image.pl', '--del']
 GENERATE = ['/opt/vyatta/bin/vyatta-op-cmd-wrapper', 'generate']
 SHOW = ['/opt/vyatta/bin/vyatta-op-cmd-wrapper', 'show']
+TEMPLATES = '/opt/vyatta/share/vyatta-cfg/templates'
 
 # Default "commit via" string
 APP = "vyos-http-api"
@@ -84,6 +87,91 @@ class ConfigSessionError(Exception):
     pass
 
 
+@lru_cache(maxsize=None)
+def node_template(node_dir):
+    """
+    Return if the node template in node_dir is a tag node, a multi node and
+    if the node takes a value
+    """
+    tag = os.path.isdir(os.path.join(node_dir, 'node.tag'))
+    multi = typed = False
+    try:
+        with open(os.path.join(node_dir, 'node.def')) as f:
+            for line in f:
+                multi = multi or line.startswith('multi:')
+                typed = typed or line.startswith('type:')
+    except OSError:
+        pass
+    return tag, multi, typed
+
+def resolve_path(path):
+    """
+    Split a path as given to my_set or my_delete into the path of the config
+    node and its value, looking up the node templates along the path. Tag node
+    names are part of the node path, the value of a leaf node is not.
+
+    Returns the node path, the value ("" if there is none), the lengths of the
+    node path prefixes which are tag nodes, if the node is a multi node and if
+    it takes a value.
+    """
+    node_dir = TEMPLATES
+    tags = []
+    leaf = multi = False
+    length = 0
+    while length < len(path):
+        name = path[length]
+        child = os.path.join(node_dir, name)
+        if '/' in name or name in ('.', '..') or not os.path.isdir(child):
+            if leaf and length == len(path) - 1:
+                return path[:length], name, tags, multi, leaf
+            raise ConfigSessionError("Configuration path: [{0}] is not valid".format(" ".join(path)))
+        node_dir = child
+        length += 1
+        tag, multi, leaf = node_template(node_dir)
+        if tag and length < len(path):
+            tags.append(length)
+            # skip the tag node name
+            node_dir = os.path.join(node_dir, 'node.tag')
+            length += 1
+            leaf = multi = False
+    return path, "", tags, multi, leaf
+
+def apply_commands(tree, commands):
+    """
+    Apply commands to a ConfigTree like my_set and my_delete would apply them
+    to a session. The commands are (op, path, value, cfg_path) tuples, as
+    checked by the HTTP API. Comments are left out, they cannot be loaded
+    from a config file.
+    """
+    for op, path, value, cfg_path in commands:
+        if op in ('set', 'delete'):
+            path, value, tags, multi, leaf = resolve_path(path + [value] if value else path)
+        if op == 'set':
+            if not value:
+                if leaf:
+                    raise ConfigSessionError("Configuration path: [{0}] requires a value".format(cfg_path))
+                tree.set(path)
+            elif not multi:
+                tree.set(path, value=value)
+            elif not (tree.exists(path) and value in tree.return_values(path)):
+                tree.set(path, value=value, replace=False)
+            # new tag nodes must be marked, else they are not rendered as such
+            for length in tags:
+                tree.set_tag(path[:length])
+        elif op == 'delete':
+            if not tree.exists(path) or (value and value not in tree.return_values(path)):
+                raise ConfigSessionError("Cannot delete [{0}]: path/value does not exist".format(cfg_path))
+            # like my_delete, a node left without a value is removed
+            if value and multi and tree.return_values(path) != [value]:
+                tree.delete_value(path, value)
+            else:
+                tree.delete(path)
+        elif op == 'comment':
+            pass
+        else:
+            raise ConfigSessionError("\"{0}\" is not a valid operation".format(op))
+
+
 class ConfigSession(object):
     """
     The write API of VyOS.
@@ -18,6 +18,7 @@ import os
 import re
 import subprocess
 
+import vyos.configcache
 from vyos.configtree import ConfigTree
 
 class VyOSError(Exception):
@@ -36,9 +37,47 @@ class ConfigSource:
     def __init__(self):
         self._running_config: ConfigTree = None
         self._session_config: ConfigTree = None
+        # Config texts the trees are parsed from, if available. Parsing is
+        # delayed until a tree is actually needed, as readers of the dict
+        # representation can be served from vyos.configcache instead.
+        self._running_config_text: str = None
+        self._session_config_text: str = None
+
+    def get_configtree(self, effective=False):
+        """
+        Returns:
+            ConfigTree: the running (effective) or proposed config,
+            None if there is none
+        """
+        if effective:
+            if self._running_config is None and self._running_config_text:
+                self._running_config = ConfigTree(self._running_config_text)
+            return self._running_config
+
+        if self._session_config is None and self._session_config_text:
+            self._session_config = ConfigTree(self._session_config_text)
+        return self._session_config
 
     def get_configtree_tuple(self):
-        return self._running_config, self._session_config
+        return self.get_configtree(effective=True), self.get_configtree()
+
+    def get_config_json(self, effective=False):
+        """
+        Returns:
+            str: JSON representation of the running (effective) or proposed
+            config, None if there is none
+        """
+        if effective:
+            config_text = self._running_config_text
+        else:
+            config_text = self._session_config_text
+
+        if config_text:
+            return vyos.configcache.get_config_json(config_text,
+                    lambda: self.get_configtree(effective).to_json())
+
+        config = self.get_configtree(effective)
+        return config.to_json() if config else None
 
     def session_changed(self):
         """
@@ -135,15 +174,9 @@ class ConfigSourceSession(ConfigSource):
         else:
             session_config_text = running_config_text
 
-        if running_config_text:
-            self._running_config = ConfigTree(running_config_text)
-        else:
-            self._running_config = None
-
-        if session_config_text:
-            self._session_config = ConfigTree(session_config_text)
-        else:
-            self._session_config = None
+        # Trees are parsed on first use, see ConfigSource.get_configtree()
+        self._running_config_text = running_config_text
+        self._session_config_text = session_config_text
 
     def _make_command(self, op, path):
         args = path.split()
@@ -308,11 +341,24 @@ class ConfigSourceSession(ConfigSource):
             return False
 
 class ConfigSourceString(ConfigSource):
-    def __init__(self, running_config_text=None, session_config_text=None):
+    def __init__(self, running_config_text=None, session_config_text=None,
+                 running_config_tree=None, session_config_tree=None):
+        """
+        Trees already parsed from the config texts can be passed along,
+        they will not be parsed again.
+        """
         super().__init__()
 
         try:
-            self._running_config = ConfigTree(running_config_text) if running_config_text else None
-            self._session_config = ConfigTree(session_config_text) if session_config_text else None
+            if running_config_tree is None and running_config_text:
+                running_config_tree = ConfigTree(running_config_text)
+            if session_config_tree is None and session_config_text:
+                session_config_tree = ConfigTree(session_config_text)
         except ValueError:
             raise ConfigSourceError(f"Init error in {type(self)}")
+
+        self._running_config = running_config_tree
+        self._session_config = session_config_tree
+
+        self._running_config_text = running_config_text
+        self._session_config_text = session_config_text
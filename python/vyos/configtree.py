@@ -15,7 +15,7 @@
 import re
 import json
 
-from ctypes import cdll, c_char_p, c_void_p, c_int
+from ctypes import cdll, c_char_p, c_void_p, c_int, c_bool
 
 
 def escape_backslash(string: str) -> str:
@@ -37,6 +37,40 @@ def check_path(path):
         pass
 
 
+def query_dict(config_dict, op, path):
+    """Answer a single path query against the JSON (dict) form of a config tree.
+    op: one of 'exists', 'return_value', 'return_values', 'list_nodes'
+    path: configuration path as a list
+    Returns the same result as the corresponding ConfigTree method would,
+    except that a non-existent path yields None instead of raising
+    ConfigTreeError ('exists' yields False)
+    """
+    check_path(path)
+    node = config_dict
+    for key in path:
+        if not isinstance(node, dict) or key not in node:
+            return False if op == 'exists' else None
+        node = node[key]
+
+    if op == 'exists':
+        return True
+    elif op == 'return_value':
+        if isinstance(node, list):
+            return node[0] if node else None
+        return node if isinstance(node, str) else None
+    elif op == 'return_values':
+        if isinstance(node, list):
+            return list(node)
+        if isinstance(node, str):
+            return [node]
+        # valueless leaf nodes have no values, nodes with children are no leafs
+        return [] if not node else None
+    elif op == 'list_nodes':
+        return list(node) if isinstance(node, dict) else None
+    else:
+        raise ValueError("Unknown query operation: {}".format(op))
+
+
 class ConfigTreeError(Exception):
     pass
 
@@ -67,6 +101,10 @@ class ConfigTree(object):
         self.__to_json.argtypes = [c_void_p]
         self.__to_json.restype = c_char_p
 
+        self.__get_subtree = self.__lib.get_subtree
+        self.__get_subtree.argtypes = [c_void_p, c_char_p, c_bool]
+        self.__get_subtree.restype = c_void_p
+
         self.__to_json_ast = self.__lib.to_json_ast
         self.__to_json_ast.argtypes = [c_void_p]
         self.__to_json_ast.restype = c_char_p
@@ -151,12 +189,41 @@ class ConfigTree(object):
     def to_commands(self):
         return self.__to_commands(self.__config).decode()
 
-    def to_json(self):
-        return self.__to_json(self.__config).decode()
+    def to_json(self, path=None):
+        """Return the JSON representation of the config, or of the node at
+        path only; libvyosconfig then copies and renders just that subtree
+        """
+        if not path:
+            return self.__to_json(self.__config).decode()
+
+        if not self.exists(path):
+            raise ConfigTreeError("Path [{}] doesn't exist".format(path))
+        path_str = " ".join(map(str, path)).encode()
+        subtree = self.__get_subtree(self.__config, path_str, False)
+        try:
+            res = self.__to_json(subtree).decode()
+        finally:
+            self.__destroy(subtree)
+
+        if res.strip() == '{}':
+            # no child nodes, a leaf is rendered like in the full config
+            values = self.return_values(path)
+            if values:
+                res = json.dumps(values[0] if len(values) == 1 else values)
+        return res
 
     def to_json_ast(self):
         return self.__to_json_ast(self.__config).decode()
 
+    def bulk_query(self, queries):
+        """Answer many path queries with a single library call and decode.
+        queries: iterable of (op, path) tuples, where op is one of
+                 'exists', 'return_value', 'return_values', 'list_nodes'
+        Returns a list of results in query order, see query_dict()
+        """
+        config_dict = json.loads(self.to_json())
+        return [query_dict(config_dict, op, path) for op, path in queries]
+
     def set(self, path, value=None, replace=True):
         """Set new entry in VyOS configuration.
         path: configuration path e.g. 'system dns forwarding listen-address'
@@ -22,7 +22,8 @@ directories = {
   "migrate": "/opt/vyatta/etc/config-migrate/migrate",
   "log": "/var/log/vyatta",
   "templates": "/usr/share/vyos/templates/",
-  "certbot": "/config/auth/letsencrypt"
+  "certbot": "/config/auth/letsencrypt",
+  "config_cache": "/run/vyos-config-cache"
 }
 
 cfg_group = 'vyattacfg'
@@ -15,6 +15,8 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 
+from copy import deepcopy
+
 from vyos import ConfigError
 
 
@@ -51,3 +53,121 @@ class FixedDict(dict):
         if k not in self._allowed:
             raise ConfigError(f'Option "{k}" has no defined default')
         super().__setitem__(k, v)
+
+
+class CopyOnWriteDict(dict):
+    """
+    CopyOnWriteDict: A dictionary sharing its nested values with the source
+    it was created from, until they are accessed.
+
+    Creating one only copies the top level of the source. Nested dicts are
+    wrapped (and lists copied) on first access, so callers only pay for the
+    branches they actually walk into, and modifications never reach the
+    source - e.g. the cached config dict of vyos.config.Config.
+
+    >>> source = {'vif': {'10': {'mtu': '1500'}}}
+    >>> d = CopyOnWriteDict(source)
+    >>> d['vif']['10']['mtu'] = '9000'
+    >>> source
+    {'vif': {'10': {'mtu': '1500'}}}
+
+    Values stored into the dict afterwards belong to it and are not copied.
+    """
+
+    def __init__(self, source=None):
+        super().__init__()
+        self._owned = set()
+        if isinstance(source, CopyOnWriteDict):
+            source._clone_into(self)
+        elif source:
+            dict.update(self, source)
+
+    def _clone_into(self, other):
+        # values already handed out may still be modified through references
+        # held by the callers, so the clone must not share any of them; the
+        # values not accessed yet are never modified and stay shared
+        for k, v in dict.items(self):
+            if k in self._owned:
+                if isinstance(v, CopyOnWriteDict):
+                    v = CopyOnWriteDict(v)
+                else:
+                    v = deepcopy(v)
+                other._owned.add(k)
+            dict.__setitem__(other, k, v)
+
+    def _own(self, k):
+        v = dict.__getitem__(self, k)
+        if k in self._owned:
+            return v
+        if isinstance(v, dict):
+            v = CopyOnWriteDict(v)
+        elif isinstance(v, list):
+            v = v.copy()
+        dict.__setitem__(self, k, v)
+        self._owned.add(k)
+        return v
+
+    def _own_all(self):
+        for k in dict.keys(self):
+            self._own(k)
+
+    def __getitem__(self, k):
+        return self._own(k)
+
+    def __setitem__(self, k, v):
+        super().__setitem__(k, v)
+        self._owned.add(k)
+
+    def __delitem__(self, k):
+        super().__delitem__(k)
+        self._owned.discard(k)
+
+    def __iter__(self):
+        # defeat the CPython fast path in dict(d) and {**d}, which would
+        # copy the shared nested values without going through _own()
+        return iter(dict.keys(self))
+
+    def get(self, k, default=None):
+        if k in self:
+            return self._own(k)
+        return default
+
+    def setdefault(self, k, default=None):
+        if k not in self:
+            self[k] = default
+        return self._own(k)
+
+    def pop(self, k, *default):
+        if k not in self:
+            if default:
+                return default[0]
+            raise KeyError(k)
+        v = self._own(k)
+        del self[k]
+        return v
+
+    def popitem(self):
+        if not self:
+            raise KeyError('popitem(): dictionary is empty')
+        k = next(reversed(dict.keys(self)))
+        return k, self.pop(k)
+
+    def update(self, *args, **kwargs):
+        for k, v in dict(*args, **kwargs).items():
+            self[k] = v
+
+    def values(self):
+        self._own_all()
+        return super().values()
+
+    def items(self):
+        self._own_all()
+        return super().items()
+
+    def copy(self):
+        return CopyOnWriteDict(self)
+
+    __copy__ = copy
+
+    def __reduce__(self):
+        return (CopyOnWriteDict, (dict(self),))
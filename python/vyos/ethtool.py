@@ -0,0 +1,179 @@
+# Copyright 2020 VyOS maintainers and contributors <maintainers@vyos.io>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+SIOCETHTOOL access to the offload features, ring buffers, pause frames and
+link settings of a NIC, without spawning ethtool. The settings are read once
+per instance, the setters only issue an ioctl when the value changes.
+
+Example:
+>>> from vyos.ethtool import Ethtool
+>>> with Ethtool('eth0') as eth:
+...     eth.get_feature('gro')
+...     eth.set_ring(rx=4096)
+True
+True
+"""
+
+import array
+import fcntl
+import socket
+import struct
+
+# include/uapi/linux/sockios.h
+SIOCETHTOOL = 0x8946
+
+# include/uapi/linux/ethtool.h
+ETHTOOL_GSET = 0x01
+ETHTOOL_GRINGPARAM = 0x10
+ETHTOOL_SRINGPARAM = 0x11
+ETHTOOL_GPAUSEPARAM = 0x12
+ETHTOOL_SPAUSEPARAM = 0x13
+ETHTOOL_GSG = 0x18
+ETHTOOL_SSG = 0x19
+ETHTOOL_GTSO = 0x1e
+ETHTOOL_STSO = 0x1f
+ETHTOOL_GUFO = 0x21
+ETHTOOL_SUFO = 0x22
+ETHTOOL_GGSO = 0x23
+ETHTOOL_SGSO = 0x24
+ETHTOOL_GGRO = 0x2b
+ETHTOOL_SGRO = 0x2c
+
+DUPLEX_HALF = 0x00
+DUPLEX_FULL = 0x01
+SPEED_UNKNOWN = 0xffffffff
+
+# feature name as used by 'ethtool -K': (get command, set command)
+_features = {
+    'sg': (ETHTOOL_GSG, ETHTOOL_SSG),
+    'tso': (ETHTOOL_GTSO, ETHTOOL_STSO),
+    'ufo': (ETHTOOL_GUFO, ETHTOOL_SUFO),
+    'gso': (ETHTOOL_GGSO, ETHTOOL_SGSO),
+    'gro': (ETHTOOL_GGRO, ETHTOOL_SGRO),
+}
+
+# struct ethtool_value
+_value = struct.Struct('=II')
+# struct ethtool_ringparam
+_ringparam = struct.Struct('=9I')
+# struct ethtool_pauseparam
+_pauseparam = struct.Struct('=4I')
+# struct ethtool_cmd
+_cmd = struct.Struct('=IIIHBBBBBBIIHBBI2I')
+
+
+class Ethtool:
+    """
+    The ethtool settings of one interface. Failing ioctls raise OSError,
+    EOPNOTSUPP when the driver does not support the setting.
+    """
+    def __init__(self, ifname):
+        self.ifname = ifname
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._features = {}
+        self._ring = None
+        self._pause = None
+
+    def close(self):
+        """ close the ioctl socket, the instance can not be used afterwards """
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _ioctl(self, packer, *values):
+        """ run one SIOCETHTOOL command, return the unpacked answer """
+        data = array.array('B', packer.pack(*values))
+        address, _ = data.buffer_info()
+        ifreq = struct.pack('16sP', self.ifname.encode(), address)
+        fcntl.ioctl(self._sock.fileno(), SIOCETHTOOL, ifreq)
+        return packer.unpack(data.tobytes())
+
+    def get_feature(self, name):
+        """ return if the offload feature (sg, tso, ufo, gso, gro) is on """
+        if name not in self._features:
+            self._features[name] = bool(self._ioctl(_value, _features[name][0], 0)[1])
+        return self._features[name]
+
+    def set_feature(self, name, enabled):
+        """ turn the offload feature on or off, if it is not already """
+        if self.get_feature(name) == enabled:
+            return False
+        self._ioctl(_value, _features[name][1], int(enabled))
+        self._features[name] = enabled
+        return True
+
+    def get_ring(self):
+        """
+        return the ring buffer sizes as a dict with the keys rx, tx and their
+        hardware maximum rx_max, tx_max
+        """
+        if self._ring is None:
+            values = self._ioctl(_ringparam, ETHTOOL_GRINGPARAM, *[0] * 8)
+            self._ring = list(values)
+        return {
+            'rx_max': self._ring[1], 'tx_max': self._ring[4],
+            'rx': self._ring[5], 'tx': self._ring[8],
+        }
+
+    def set_ring(self, rx=None, tx=None):
+        """ change the rx and/or tx ring buffer size, if they differ """
+        ring = self.get_ring()
+        if (rx is None or int(rx) == ring['rx']) and (tx is None or int(tx) == ring['tx']):
+            return False
+        values = list(self._ring)
+        values[0] = ETHTOOL_SRINGPARAM
+        if rx is not None:
+            values[5] = int(rx)
+        if tx is not None:
+            values[8] = int(tx)
+        self._ioctl(_ringparam, *values)
+        self._ring = [ETHTOOL_GRINGPARAM] + values[1:]
+        return True
+
+    def get_pause(self):
+        """ return the pause frame settings as a dict: autoneg, rx, tx """
+        if self._pause is None:
+            _, autoneg, rx, tx = self._ioctl(_pauseparam, ETHTOOL_GPAUSEPARAM, 0, 0, 0)
+            self._pause = {'autoneg': bool(autoneg), 'rx': bool(rx), 'tx': bool(tx)}
+        return dict(self._pause)
+
+    def set_pause(self, autoneg, rx, tx):
+        """ change the pause frame settings, if they differ """
+        pause = {'autoneg': bool(autoneg), 'rx': bool(rx), 'tx': bool(tx)}
+        if self.get_pause() == pause:
+            return False
+        self._ioctl(_pauseparam, ETHTOOL_SPAUSEPARAM,
+                    int(autoneg), int(rx), int(tx))
+        self._pause = pause
+        return True
+
+    def get_link(self):
+        """
+        return the link settings as a dict: autoneg (bool), speed in Mbit/s
+        and duplex ('half' or 'full'), None when unknown
+        """
+        values = self._ioctl(_cmd, ETHTOOL_GSET, *[0] * 17)
+        speed = values[3] | (values[12] << 16)
+        duplex = {DUPLEX_HALF: 'half', DUPLEX_FULL: 'full'}.get(values[4], None)
+        return {
+            'autoneg': bool(values[8]),
+            'speed': None if speed in (0, 0xffff, SPEED_UNKNOWN) else speed,
+            'duplex': duplex,
+        }
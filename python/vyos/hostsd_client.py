@@ -1,6 +1,8 @@
 import json
 import zmq
 
+from contextlib import contextmanager
+
 SOCKET_PATH = "ipc:///run/vyos-hostsd/vyos-hostsd.sock"
 
 class VyOSHostsdError(Exception):
@@ -16,8 +18,14 @@ class Client(object):
             self.__socket.connect(SOCKET_PATH)
         except zmq.error.Again:
             raise VyOSHostsdError("Could not connect to vyos-hostsd")
+        self.__batch = None
 
     def _communicate(self, msg):
+        # collected by batch(), sent later as one bulk message
+        if self.__batch is not None and msg['op'] in ['add', 'delete', 'set']:
+            self.__batch.append(msg)
+            return None
+
         try:
             request = json.dumps(msg).encode()
             self.__socket.send(request)
@@ -31,6 +39,35 @@ class Client(object):
         except zmq.error.Again:
             raise VyOSHostsdError("Could not connect to vyos-hostsd")
 
+    @contextmanager
+    def batch(self):
+        """
+        Collect the add, delete and set calls made in this context and send
+        them as a single bulk message when it is left. Nothing is sent if
+        the context is left with an exception.
+
+        Example:
+        >>> with client.batch():
+        ...     client.delete_hosts(['static'])
+        ...     client.add_hosts({'static': hosts})
+        """
+        if self.__batch is not None:
+            yield
+            return
+
+        self.__batch = []
+        try:
+            yield
+            msgs, self.__batch = self.__batch, None
+            if msgs:
+                self.bulk(msgs)
+        finally:
+            self.__batch = None
+
+    def bulk(self, msgs):
+        msg = {'op': 'bulk', 'data': msgs}
+        self._communicate(msg)
+
     def add_name_servers(self, data):
         msg = {'type': 'name_servers', 'op': 'add', 'data': data}
         self._communicate(msg)
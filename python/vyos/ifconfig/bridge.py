@@ -103,6 +103,15 @@ class BridgeIf(Interface):
         },
     }}
 
+    _netlink_set = {**Interface._netlink_set, **{
+        'add_port': {
+            'netlink': lambda nl, c: nl.set_link(c['value'], master=c['ifname']),
+        },
+        'del_port': {
+            'netlink': lambda nl, c: nl.set_link(c['value'], master=''),
+        },
+    }}
+
     def get_vlan_filter(self):
         """
         Get the status of the bridge VLAN filter
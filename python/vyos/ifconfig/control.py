@@ -15,20 +15,28 @@
 
 import os
 
+from time import monotonic
 from inspect import signature
 from inspect import _empty
 
 from vyos import debug
 from vyos.util import popen
 from vyos.util import cmd
+from vyos.netlink import rtnl
 from vyos.ifconfig.section import Section
 
 
 class Control(Section):
     _command_get = {}
     _command_set = {}
+    _netlink_get = {}
+    _netlink_set = {}
     _signature = {}
 
+    # when set, the operations defined in _netlink_get and _netlink_set are
+    # performed over rtnetlink instead of with their iproute2 shellcmd
+    _use_netlink = False
+
     def __init__(self, **kargs):
         # some commands (such as operation comands - show interfaces, etc.)
         # need to query the interface statistics. If the interface
@@ -50,6 +58,13 @@ class Control(Section):
     def _cmd(self, command):
         return cmd(command, self.debug)
 
+    def _ip_batch(self, commands):
+        """
+        Run a list of iproute2 commands, given without the leading 'ip', in a
+        single 'ip -batch' process. iproute2 stops at the first failing line.
+        """
+        return cmd('ip -batch -', self.debug, input='\n'.join(commands))
+
     def _get_command(self, config, name):
         """
         Using the defined names, set data write to sysfs.
@@ -108,9 +123,64 @@ class Control(Section):
         cmd = self._command_set[name]['shellcmd'].format(**config)
         return self._command_set[name].get('format', lambda _: _)(self._cmd(cmd))
 
+    def _get_netlink(self, config, name):
+        """
+        Using the defined names, get data from rtnetlink.
+        """
+        return self._netlink_get[name]['netlink'](rtnl, config)
+
+    def _set_netlink(self, config, name, value):
+        """
+        Using the defined names, set data over rtnetlink.
+        """
+        # the code can pass int as int
+        value = str(value)
+
+        validate = self._netlink_set[name].get('validate', None)
+        if validate:
+            try:
+                validate(**self._values(name, validate, value))
+            except Exception as e:
+                raise e.__class__(f'Could not set {name}. {e}')
+
+        convert = self._netlink_set[name].get('convert', None)
+        if convert:
+            value = convert(value)
+
+        config = {**config, **{'value': value}}
+
+        self._debug_msg("netlink {} '{}' on '{}'".format(name, value, config['ifname']))
+        return self._netlink_set[name]['netlink'](rtnl, config)
+
     _sysfs_get = {}
     _sysfs_set = {}
 
+    # current content of the _sysfs_set locations, see _snapshot_sysfs()
+    _sysfs_state = None
+
+    def _snapshot_sysfs(self, config):
+        """
+        Read the current value of every _sysfs_set location in one pass.
+        Until _release_sysfs() is called, _set_sysfs() will not write the
+        values which are already in place.
+        """
+        state = {}
+        for name in self._sysfs_set:
+            filename = self._sysfs_set[name]['location'].format(**config)
+            try:
+                with open(filename, 'r') as f:
+                    state[filename] = f.read().rstrip('\n')
+            except OSError:
+                pass
+        self._sysfs_state = state
+
+    def _release_sysfs(self):
+        """
+        Drop the snapshot taken by _snapshot_sysfs(), writes are unconditional
+        again.
+        """
+        self._sysfs_state = None
+
     def _read_sysfs(self, filename):
         """
         Provide a single primitive w/ error checking for reading from sysfs.
@@ -133,6 +203,27 @@ class Control(Section):
             return True
         return False
 
+    # seconds during which a value read from sysfs is reused, 0 disables the
+    # cache, which is shared by all the instances (and interfaces)
+    _sysfs_ttl = 0
+    _sysfs_cache = {}
+
+    def _read_sysfs_cached(self, filename):
+        """
+        _read_sysfs() going through the cache when the class has a TTL.
+        """
+        if not self._sysfs_ttl:
+            return self._read_sysfs(filename)
+
+        now = monotonic()
+        cached = self._sysfs_cache.get(filename, None)
+        if cached and cached[0] > now:
+            return cached[1]
+
+        value = self._read_sysfs(filename)
+        self._sysfs_cache[filename] = (now + self._sysfs_ttl, value)
+        return value
+
     def _get_sysfs(self, config, name):
         """
         Using the defined names, get data write from sysfs.
@@ -140,7 +231,7 @@ class Control(Section):
         filename = self._sysfs_get[name]['location'].format(**config)
         if not filename:
             return None
-        return self._read_sysfs(filename)
+        return self._read_sysfs_cached(filename)
 
     def _set_sysfs(self, config, name, value):
         """
@@ -162,8 +253,16 @@ class Control(Section):
         if convert:
             value = convert(value)
 
-        commited = self._write_sysfs(
-            self._sysfs_set[name]['location'].format(**config), value)
+        filename = self._sysfs_set[name]['location'].format(**config)
+        if self._sysfs_state is not None:
+            # an empty string is written as NUL (e.g. to clear the alias)
+            if self._sysfs_state.get(filename) == str(value).rstrip('\0'):
+                self._debug_msg("unchanged '{}' = '{}'".format(value, filename))
+                return True
+            # the kernel may normalise what is written, do not trust it anymore
+            self._sysfs_state.pop(filename, None)
+
+        commited = self._write_sysfs(filename, value)
         if not commited:
             errmsg = self._sysfs_set.get('errormsg', '')
             if errmsg:
@@ -171,6 +270,8 @@ class Control(Section):
         return commited
 
     def get_interface(self, name):
+        if self._use_netlink and name in self._netlink_get:
+            return self._get_netlink(self.config, name)
         if name in self._sysfs_get:
             return self._get_sysfs(self.config, name)
         if name in self._command_get:
@@ -178,6 +279,8 @@ class Control(Section):
         raise KeyError(f'{name} is not a attribute of the interface we can get')
 
     def set_interface(self, name, value):
+        if self._use_netlink and name in self._netlink_set:
+            return self._set_netlink(self.config, name, value)
         if name in self._sysfs_set:
             return self._set_sysfs(self.config, name, value)
         if name in self._command_set:
@@ -14,11 +14,10 @@
 # License along with this library.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
-import re
+import errno
 
+from vyos.ethtool import Ethtool
 from vyos.ifconfig.interface import Interface
-from vyos.validate import assert_list
-from vyos.util import run
 from vyos.util import dict_search
 
 @Interface.register
@@ -42,38 +41,30 @@ class EthernetIf(Interface):
         }
     }
 
-    @staticmethod
-    def feature(ifname, option, value):
-        run(f'ethtool -K {ifname} {option} {value}','ifconfig')
-        return False
-
-    _command_set = {**Interface._command_set, **{
-        'gro': {
-            'validate': lambda v: assert_list(v, ['on', 'off']),
-            'possible': lambda i, v: EthernetIf.feature(i, 'gro', v),
-            # 'shellcmd': 'ethtool -K {ifname} gro {value}',
-        },
-        'gso': {
-            'validate': lambda v: assert_list(v, ['on', 'off']),
-            'possible': lambda i, v: EthernetIf.feature(i, 'gso', v),
-            # 'shellcmd': 'ethtool -K {ifname} gso {value}',
-        },
-        'sg': {
-            'validate': lambda v: assert_list(v, ['on', 'off']),
-            'possible': lambda i, v: EthernetIf.feature(i, 'sg', v),
-            # 'shellcmd': 'ethtool -K {ifname} sg {value}',
-        },
-        'tso': {
-            'validate': lambda v: assert_list(v, ['on', 'off']),
-            'possible': lambda i, v: EthernetIf.feature(i, 'tso', v),
-            # 'shellcmd': 'ethtool -K {ifname} tso {value}',
-        },
-        'ufo': {
-            'validate': lambda v: assert_list(v, ['on', 'off']),
-            'possible': lambda i, v: EthernetIf.feature(i, 'ufo', v),
-            # 'shellcmd': 'ethtool -K {ifname} ufo {value}',
-        },
-    }}
+    # the ethtool settings of the interface, read once per update()
+    _ethtool = None
+
+    def _get_ethtool(self):
+        if self._ethtool is None:
+            self._ethtool = Ethtool(self.config['ifname'])
+        return self._ethtool
+
+    def _release_ethtool(self):
+        if self._ethtool is not None:
+            self._ethtool.close()
+            self._ethtool = None
+
+    def feature(self, option, state):
+        """
+        Turn the offload feature on or off, returns True if it was changed.
+        As with 'ethtool -K', unsupported features are not an error.
+        """
+        if not isinstance(state, bool):
+            raise ValueError("Value out of range")
+        try:
+            return self._get_ethtool().set_feature(option, state)
+        except OSError:
+            return False
 
     def get_driver_name(self):
         """
@@ -115,38 +106,17 @@ class EthernetIf(Interface):
                             .format(self.get_driver_name()))
             return
 
-        # Get current flow control settings:
-        cmd = f'ethtool --show-pause {ifname}'
-        output, code = self._popen(cmd)
-        if code == 76:
+        # Applying the flow-control settings takes the interface down and
+        # brings it back up, they are only changed when they differ, to
+        # prevent the interface from flapping.
+        try:
+            on = enable == 'on'
+            self._get_ethtool().set_pause(on, on, on)
+        except OSError as e:
             # the interface does not support it
-            return ''
-        if code:
-            # never fail here as it prevent vyos to boot
-            print(f'unexpected return code {code} from {cmd}')
-            return ''
-
-        # The above command returns - with tabs:
-        #
-        # Pause parameters for eth0:
-        # Autonegotiate:  on
-        # RX:             off
-        # TX:             off
-        if re.search("Autonegotiate:\ton", output):
-            if enable == "on":
-                # flowcontrol is already enabled - no need to re-enable it again
-                # this will prevent the interface from flapping as applying the
-                # flow-control settings will take the interface down and bring
-                # it back up every time.
-                return ''
-
-        # Assemble command executed on system. Unfortunately there is no way
-        # to change this setting via sysfs
-        cmd = f'ethtool --pause {ifname} autoneg {enable} tx {enable} rx {enable}'
-        output, code = self._popen(cmd)
-        if code:
-            print(f'could not set flowcontrol for {ifname}')
-        return output
+            if e.errno != errno.EOPNOTSUPP:
+                print(f'could not set flowcontrol for {ifname}')
+        return ''
 
     def set_speed_duplex(self, speed, duplex):
         """
@@ -174,30 +144,18 @@ class EthernetIf(Interface):
 
         # Get current speed and duplex settings:
         ifname = self.config['ifname']
-        cmd = f'ethtool {ifname}'
-        tmp = self._cmd(cmd)
-
-        if re.search("\tAuto-negotiation: on", tmp):
-            if speed == 'auto' and duplex == 'auto':
-                # bail out early as nothing is to change
-                return
-        else:
-            # read in current speed and duplex settings
-            cur_speed = 0
-            cur_duplex = ''
-            for line in tmp.splitlines():
-                if line.lstrip().startswith("Speed:"):
-                    non_decimal = re.compile(r'[^\d.]+')
-                    cur_speed = non_decimal.sub('', line)
-                    continue
-
-                if line.lstrip().startswith("Duplex:"):
-                    cur_duplex = line.split()[-1].lower()
-                    break
-
-            if (cur_speed == speed) and (cur_duplex == duplex):
+        try:
+            link = self._get_ethtool().get_link()
+            if link['autoneg']:
+                if speed == 'auto' and duplex == 'auto':
+                    # bail out early as nothing is to change
+                    return
+            elif (str(link['speed']) == speed) and (link['duplex'] == duplex):
                 # bail out early as nothing is to change
                 return
+        except OSError:
+            # unknown settings, let ethtool apply them
+            pass
 
         cmd = f'ethtool -s {ifname}'
         if speed == 'auto' or duplex == 'auto':
@@ -215,9 +173,7 @@ class EthernetIf(Interface):
         >>> i = EthernetIf('eth0')
         >>> i.set_gro(True)
         """
-        if not isinstance(state, bool):
-            raise ValueError("Value out of range")
-        return self.set_interface('gro', 'on' if state else 'off')
+        return self.feature('gro', state)
 
     def set_gso(self, state):
         """
@@ -227,9 +183,7 @@ class EthernetIf(Interface):
         >>> i = EthernetIf('eth0')
         >>> i.set_gso(True)
         """
-        if not isinstance(state, bool):
-            raise ValueError("Value out of range")
-        return self.set_interface('gso', 'on' if state else 'off')
+        return self.feature('gso', state)
 
     def set_sg(self, state):
         """
@@ -240,9 +194,7 @@ class EthernetIf(Interface):
         >>> i = EthernetIf('eth0')
         >>> i.set_sg(True)
         """
-        if not isinstance(state, bool):
-            raise ValueError("Value out of range")
-        return self.set_interface('sg', 'on' if state else 'off')
+        return self.feature('sg', state)
 
     def set_tso(self, state):
         """
@@ -253,9 +205,7 @@ class EthernetIf(Interface):
         >>> i = EthernetIf('eth0')
         >>> i.set_tso(False)
         """
-        if not isinstance(state, bool):
-            raise ValueError("Value out of range")
-        return self.set_interface('tso', 'on' if state else 'off')
+        return self.feature('tso', state)
 
     def set_ufo(self, state):
         """
@@ -266,9 +216,7 @@ class EthernetIf(Interface):
         >>> i = EthernetIf('eth0')
         >>> i.set_udp_offload(True)
         """
-        if not isinstance(state, bool):
-            raise ValueError("Value out of range")
-        return self.set_interface('ufo', 'on' if state else 'off')
+        return self.feature('ufo', state)
 
     def set_xdp(self, state):
         """
@@ -302,25 +250,15 @@ class EthernetIf(Interface):
         >>> i.set_ring_buffer('rx', '4096')
         """
         ifname = self.config['ifname']
-        cmd = f'ethtool -G {ifname} {b_type} {b_size}'
-        output, code = self._popen(cmd)
-        # ethtool error codes:
-        #  80 - value already setted
-        #  81 - does not possible to set value
-        if code and code != 80:
+        try:
+            self._get_ethtool().set_ring(**{b_type: b_size})
+        except OSError:
             print(f'could not set "{b_type}" ring-buffer for {ifname}')
-        return output
-
-
-    def update(self, config):
-        """ General helper function which works on a dictionary retrived by
-        get_config_dict(). It's main intention is to consolidate the scattered
-        interface setup code and provide a single point of entry when workin
-        on any interface. """
+        return ''
 
-        # call base class first
-        super().update(config)
 
+    def _update_ethtool(self, config):
+        """ Apply the NIC settings of update() """
         # disable ethernet flow control (pause frames)
         value = 'off' if 'disable_flow_control' in config else 'on'
         self.set_flow_control(value)
@@ -354,6 +292,23 @@ class EthernetIf(Interface):
             for b_type in config['ring_buffer']:
                 self.set_ring_buffer(b_type, config['ring_buffer'][b_type])
 
+    def update(self, config):
+        """ General helper function which works on a dictionary retrived by
+        get_config_dict(). It's main intention is to consolidate the scattered
+        interface setup code and provide a single point of entry when workin
+        on any interface. """
+
+        # call base class first
+        super().update(config)
+
+        # read the ethtool settings again, they are only changed if needed -
+        # the ioctl socket is closed again when done
+        self._release_ethtool()
+        try:
+            self._update_ethtool(config)
+        finally:
+            self._release_ethtool()
+
         # Enable/Disable of an interface must always be done at the end of the
         # derived class to make use of the ref-counting set_admin_state()
         # function. We will only enable the interface if 'up' was called as
@@ -17,12 +17,16 @@ from netifaces import interfaces
 import os
 import re
 import json
+import errno
 import jmespath
 
 from copy import deepcopy
 from glob import glob
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 
 from ipaddress import IPv4Network
+from ipaddress import ip_interface
 from ipaddress import IPv6Address
 from ipaddress import IPv6Network
 from netifaces import ifaddresses
@@ -31,7 +35,6 @@ from netifaces import AF_INET
 from netifaces import AF_INET6
 
 from vyos import ConfigError
-from vyos.configdict import list_diff
 from vyos.configdict import dict_merge
 from vyos.configdict import get_vlan_ids
 from vyos.template import render
@@ -50,6 +53,8 @@ from vyos.validate import assert_mtu
 from vyos.validate import assert_positive
 from vyos.validate import assert_range
 
+from vyos.netlink import rtnl
+from vyos.netlink import IFF_UP
 from vyos.ifconfig.control import Control
 from vyos.ifconfig.vrrp import VRRP
 from vyos.ifconfig.operational import Operational
@@ -108,6 +113,47 @@ class Interface(Control):
         },
     }
 
+    _use_netlink = True
+
+    # threads used to update independent VLAN subinterfaces concurrently
+    _vlan_workers = 8
+
+    # addresses assigned to the interface during update(), see _is_addr_assigned()
+    _addr_state = None
+    # the primary (first) IPv4 address of every subnet in _addr_state, and
+    # all the IPv4 addresses of each subnet
+    _addr_primary = None
+    _addr_subnets = None
+    # a primary address was deleted, the kernel may have dropped or promoted
+    # the other addresses of its subnet - _addr_state must be re-read
+    _addr_stale = False
+
+    _netlink_get = {
+        'admin_state': {
+            'netlink': lambda nl, c: 'up' if nl.get_link(c['ifname'])['flags'] & IFF_UP else 'down',
+        },
+        'min_mtu': {
+            'netlink': lambda nl, c: nl.get_link(c['ifname'])['min_mtu'],
+        },
+        'max_mtu': {
+            'netlink': lambda nl, c: nl.get_link(c['ifname'])['max_mtu'],
+        },
+    }
+
+    _netlink_set = {
+        'admin_state': {
+            'validate': lambda v: assert_list(v, ['up', 'down']),
+            'netlink': lambda nl, c: nl.set_link(c['ifname'], state=c['value']),
+        },
+        'mac': {
+            'validate': assert_mac,
+            'netlink': lambda nl, c: nl.set_link(c['ifname'], address=c['value']),
+        },
+        'vrf': {
+            'netlink': lambda nl, c: nl.set_link(c['ifname'], master=c['value']),
+        },
+    }
+
     _sysfs_get = {
         'alias': {
             'location': '/sys/class/net/{ifname}/ifalias',
@@ -749,29 +795,69 @@ class Interface(Control):
         ipv4 = []
         ipv6 = []
 
-        if AF_INET in ifaddresses(self.config['ifname']).keys():
-            for v4_addr in ifaddresses(self.config['ifname'])[AF_INET]:
-                # we need to manually assemble a list of IPv4 address/prefix
-                prefix = '/' + \
-                    str(IPv4Network('0.0.0.0/' + v4_addr['netmask']).prefixlen)
-                ipv4.append(v4_addr['addr'] + prefix)
-
-        if AF_INET6 in ifaddresses(self.config['ifname']).keys():
-            for v6_addr in ifaddresses(self.config['ifname'])[AF_INET6]:
-                # Note that currently expanded netmasks are not supported. That means
-                # 2001:db00::0/24 is a valid argument while 2001:db00::0/ffff:ff00:: not.
-                # see https://docs.python.org/3/library/ipaddress.html
-                bits = bin(
-                    int(v6_addr['netmask'].replace(':', ''), 16)).count('1')
-                prefix = '/' + str(bits)
-
-                # we alsoneed to remove the interface suffix on link local
-                # addresses
-                v6_addr['addr'] = v6_addr['addr'].split('%')[0]
-                ipv6.append(v6_addr['addr'] + prefix)
+        # a single query, every ifaddresses() call dumps all the addresses
+        addresses = ifaddresses(self.config['ifname'])
+
+        for v4_addr in addresses.get(AF_INET, []):
+            # we need to manually assemble a list of IPv4 address/prefix
+            prefix = IPv4Network('0.0.0.0/' + v4_addr['netmask']).prefixlen
+            ipv4.append(f'{v4_addr["addr"]}/{prefix}')
+
+        for v6_addr in addresses.get(AF_INET6, []):
+            # depending on the netifaces version the netmask is either the
+            # expanded mask or the mask with the prefix length appended
+            # (ffff:ffff:ffff:ffff::/64) - count the bits of the mask itself
+            netmask = IPv6Address(v6_addr['netmask'].split('/')[0])
+            prefix = bin(int(netmask)).count('1')
+
+            # we also need to remove the interface suffix on link local
+            # addresses
+            ipv6.append(f'{v6_addr["addr"].split("%")[0]}/{prefix}')
 
         return ipv4 + ipv6
 
+    def _snapshot_addrs(self):
+        """
+        Take the address set used by _is_addr_assigned() during update(),
+        return the addresses in kernel order
+        """
+        addrs = [ip_interface(addr) for addr in self.get_addr()]
+        self._addr_state = set()
+        self._addr_primary = {}
+        self._addr_subnets = {}
+        self._addr_stale = False
+        for addr in addrs:
+            self._remember_addr(addr)
+        return addrs
+
+    def _release_addrs(self):
+        self._addr_state = None
+        self._addr_primary = None
+        self._addr_subnets = None
+        self._addr_stale = False
+
+    def _remember_addr(self, addr):
+        """ Add an assigned address to the update() address set """
+        self._addr_state.add(addr)
+        if addr.version == 4:
+            self._addr_primary.setdefault(addr.network, addr)
+            self._addr_subnets.setdefault(addr.network, set()).add(addr)
+
+    def _is_addr_assigned(self, addr, exact=True):
+        """
+        Check if the address is assigned to the interface. While update() runs,
+        this is answered from the address set taken at its start and kept in
+        sync by add_addr() and del_addr() instead of querying the kernel for
+        every address. After a primary address was deleted, the set is only
+        re-read when an exact answer is needed - deleting an address which
+        already went away with its primary is harmless.
+        """
+        if self._addr_state is None:
+            return is_intf_addr_assigned(self.ifname, addr)
+        if exact and self._addr_stale:
+            self._snapshot_addrs()
+        return ip_interface(addr) in self._addr_state
+
     def add_addr(self, addr):
         """
         Add IP(v6) address to interface. Address is only added if it is not
@@ -815,12 +901,19 @@ class Interface(Control):
             self.set_dhcp(True)
         elif addr == 'dhcpv6':
             self.set_dhcpv6(True)
-        elif not is_intf_addr_assigned(self.ifname, addr):
-            self._cmd(f'ip addr add "{addr}" '
-                    f'{"brd + " if addr_is_v4 else ""}dev "{self.ifname}"')
+        elif not self._is_addr_assigned(addr):
+            if self._use_netlink:
+                self._debug_msg(f"netlink add address '{addr}' on '{self.ifname}'")
+                rtnl.add_addr(self.ifname, addr, broadcast=addr_is_v4)
+            else:
+                self._cmd(f'ip addr add "{addr}" '
+                        f'{"brd + " if addr_is_v4 else ""}dev "{self.ifname}"')
         else:
             return False
 
+        if self._addr_state is not None and addr not in ('dhcp', 'dhcpv6'):
+            self._remember_addr(ip_interface(addr))
+
         # add to cache
         self._addr.append(addr)
 
@@ -856,8 +949,21 @@ class Interface(Control):
             self.set_dhcp(False)
         elif addr == 'dhcpv6':
             self.set_dhcpv6(False)
-        elif is_intf_addr_assigned(self.ifname, addr):
-            self._cmd(f'ip addr del "{addr}" dev "{self.ifname}"')
+        elif self._is_addr_assigned(addr, exact=not self._use_netlink):
+            if self._use_netlink:
+                self._debug_msg(f"netlink delete address '{addr}' on '{self.ifname}'")
+                try:
+                    rtnl.del_addr(self.ifname, addr)
+                except OSError as e:
+                    # went away together with a deleted primary address
+                    if e.errno != errno.EADDRNOTAVAIL or not self._addr_stale:
+                        raise
+                    self._forget_addr(ip_interface(addr))
+                    return False
+            else:
+                self._cmd(f'ip addr del "{addr}" dev "{self.ifname}"')
+            if self._addr_state is not None:
+                self._forget_addr(ip_interface(addr))
         else:
             return False
 
@@ -867,6 +973,24 @@ class Interface(Control):
 
         return True
 
+    def _forget_addr(self, addr):
+        """
+        Drop a deleted address from the update() address set. Removing a
+        primary IPv4 address may also remove (or promote) the secondary
+        addresses of the same subnet, the set is then marked stale and
+        re-read once by the next _is_addr_assigned() needing an exact answer.
+        """
+        self._addr_state.discard(addr)
+        if addr.version != 4:
+            return
+
+        subnet = self._addr_subnets.get(addr.network, set())
+        subnet.discard(addr)
+        if self._addr_primary.get(addr.network) == addr:
+            del self._addr_primary[addr.network]
+            if subnet:
+                self._addr_stale = True
+
     def flush_addrs(self):
         """
         Flush all addresses from an interface, including DHCP.
@@ -878,7 +1002,17 @@ class Interface(Control):
         self.set_dhcpv6(False)
 
         # flush all addresses
-        self._cmd(f'ip addr flush dev "{self.ifname}"')
+        if self._use_netlink:
+            self._debug_msg(f"netlink flush addresses on '{self.ifname}'")
+            rtnl.flush_addr(self.ifname)
+        else:
+            self._cmd(f'ip addr flush dev "{self.ifname}"')
+
+        if self._addr_state is not None:
+            self._addr_state.clear()
+            self._addr_primary.clear()
+            self._addr_subnets.clear()
+            self._addr_stale = False
 
     def add_to_bridge(self, bridge_dict):
         """
@@ -1098,6 +1232,92 @@ class Interface(Control):
                     mirror_cmd = f'tc filter add dev {intf} parent 1: protocol all prio 10 u32 match u32 0 0 flowid 1:1 action mirred egress mirror dev {ifname}'
                     self._cmd(mirror_cmd)
 
+    def _create_vlans(self, config):
+        """
+        Create the missing 802.1ad (vif-s), client (vif-c) and 802.1q (vif)
+        VLAN interfaces found in config in a single 'ip -batch' run, instead
+        of one 'ip link add' per VLANIf instance. A vif-c refers to its vif-s
+        by name, which is only resolved when its line of the batch runs.
+        """
+        ifname = config['ifname']
+        batch = []
+
+        for vif_s_id, vif_s_config in config.get('vif_s', {}).items():
+            vif_s_ifname = f'{ifname}.{vif_s_id}'
+            if not self.exists(vif_s_ifname):
+                batch.append(f'link add link {ifname} name {vif_s_ifname} '
+                             f'type vlan id {vif_s_id} protocol {vif_s_config["protocol"]}')
+
+            for vif_c_id in vif_s_config.get('vif_c', {}):
+                vif_c_ifname = f'{vif_s_ifname}.{vif_c_id}'
+                if not self.exists(vif_c_ifname):
+                    batch.append(f'link add link {vif_s_ifname} name {vif_c_ifname} '
+                                 f'type vlan id {vif_c_id}')
+
+        for vif_id in config.get('vif', {}):
+            vif_ifname = f'{ifname}.{vif_id}'
+            if not self.exists(vif_ifname):
+                batch.append(f'link add link {ifname} name {vif_ifname} '
+                             f'type vlan id {vif_id}')
+
+        if batch:
+            self._ip_batch(batch)
+
+    def _apply_vlans(self, tasks):
+        """
+        Run VLAN update tasks which do not depend on each other in a thread
+        pool of at most _vlan_workers threads, then raise the first error.
+        Every VLANIf instance keeps its own ref-counted admin state.
+        """
+        if len(tasks) < 2:
+            for task in tasks:
+                task()
+            return
+
+        with ThreadPoolExecutor(max_workers=self._vlan_workers) as pool:
+            futures = [pool.submit(task) for task in tasks]
+        for future in futures:
+            future.result()
+
+    def _update_vif_s(self, vif_s_id, vif_s_config):
+        ifname = self.ifname
+        tmp = deepcopy(VLANIf.get_config())
+        tmp['protocol'] = vif_s_config['protocol']
+        tmp['source_interface'] = ifname
+        tmp['vlan_id'] = vif_s_id
+
+        vif_s_ifname = f'{ifname}.{vif_s_id}'
+        vif_s_config['ifname'] = vif_s_ifname
+        s_vlan = VLANIf(vif_s_ifname, **tmp)
+        s_vlan.update(vif_s_config)
+
+        # remove no longer required client VLAN (vif-c)
+        for vif_c_id in vif_s_config.get('vif_c_remove', {}):
+            vif_c_ifname = f'{vif_s_ifname}.{vif_c_id}'
+            VLANIf(vif_c_ifname).remove()
+
+    def _update_vif_c(self, vif_s_id, vif_c_id, vif_c_config):
+        vif_s_ifname = f'{self.ifname}.{vif_s_id}'
+        tmp = deepcopy(VLANIf.get_config())
+        tmp['source_interface'] = vif_s_ifname
+        tmp['vlan_id'] = vif_c_id
+
+        vif_c_ifname = f'{vif_s_ifname}.{vif_c_id}'
+        vif_c_config['ifname'] = vif_c_ifname
+        c_vlan = VLANIf(vif_c_ifname, **tmp)
+        c_vlan.update(vif_c_config)
+
+    def _update_vif(self, vif_id, vif_config):
+        ifname = self.ifname
+        tmp = deepcopy(VLANIf.get_config())
+        tmp['source_interface'] = ifname
+        tmp['vlan_id'] = vif_id
+
+        vif_ifname = f'{ifname}.{vif_id}'
+        vif_config['ifname'] = vif_ifname
+        vlan = VLANIf(vif_ifname, **tmp)
+        vlan.update(vif_config)
+
     def update(self, config):
         """ General helper function which works on a dictionary retrived by
         get_config_dict(). It's main intention is to consolidate the scattered
@@ -1109,6 +1329,17 @@ class Interface(Control):
         # method to apply()?
         self._config = config
 
+        # Only write the sysfs/procfs settings which differ from the kernel,
+        # the snapshot must not outlive this call - also not on errors
+        self._snapshot_sysfs(self.config)
+        try:
+            self._update(config)
+        finally:
+            self._release_sysfs()
+            self._release_addrs()
+
+    def _update(self, config):
+        """ Apply the configuration, see update() """
         # Change interface MAC address - re-set to real hardware address (hw-id)
         # if custom mac is removed. Skip if bond member.
         if 'is_bond_member' not in config:
@@ -1139,18 +1370,24 @@ class Interface(Control):
         if 'dhcpv6' not in new_addr or dhcpv6pd == None:
             self.del_addr('dhcpv6')
 
-        # determine IP addresses which are assigned to the interface and build a
-        # list of addresses which are no longer in the dict so they can be removed
-        cur_addr = self.get_addr()
-        for addr in list_diff(cur_addr, new_addr):
+        # determine IP addresses which are assigned to the interface, compare
+        # them normalized with the configured ones and remove those which are
+        # no longer in the dict - the set is then used by add_addr()/del_addr()
+        wanted = {ip_interface(addr) for addr in new_addr
+                  if addr not in ('dhcp', 'dhcpv6')}
+        eui64 = None
+        for addr in self._snapshot_addrs():
+            if addr in wanted:
+                continue
             # we will delete all interface specific IP addresses if they are not
             # explicitly configured on the CLI
-            if is_ipv6_link_local(addr):
-                eui64 = mac2eui64(self.get_mac(), 'fe80::/64')
-                if addr != f'{eui64}/64':
-                    self.del_addr(addr)
+            if is_ipv6_link_local(str(addr)):
+                if eui64 is None:
+                    eui64 = ip_interface(mac2eui64(self.get_mac(), 'fe80::/64') + '/64')
+                if addr != eui64:
+                    self.del_addr(str(addr))
             else:
-                self.del_addr(addr)
+                self.del_addr(str(addr))
 
         for addr in new_addr:
             self.add_addr(addr)
@@ -1276,49 +1513,28 @@ class Interface(Control):
             vif_s_ifname = f'{ifname}.{vif_s_id}'
             VLANIf(vif_s_ifname).remove()
 
-        # create/update 802.1ad (Q-in-Q VLANs)
-        for vif_s_id, vif_s_config in config.get('vif_s', {}).items():
-            tmp = deepcopy(VLANIf.get_config())
-            tmp['protocol'] = vif_s_config['protocol']
-            tmp['source_interface'] = ifname
-            tmp['vlan_id'] = vif_s_id
-
-            vif_s_ifname = f'{ifname}.{vif_s_id}'
-            vif_s_config['ifname'] = vif_s_ifname
-            s_vlan = VLANIf(vif_s_ifname, **tmp)
-            s_vlan.update(vif_s_config)
-
-            # remove no longer required client VLAN (vif-c)
-            for vif_c_id in vif_s_config.get('vif_c_remove', {}):
-                vif_c_ifname = f'{vif_s_ifname}.{vif_c_id}'
-                VLANIf(vif_c_ifname).remove()
-
-            # create/update client VLAN (vif-c) interface
-            for vif_c_id, vif_c_config in vif_s_config.get('vif_c', {}).items():
-                tmp = deepcopy(VLANIf.get_config())
-                tmp['source_interface'] = vif_s_ifname
-                tmp['vlan_id'] = vif_c_id
-
-                vif_c_ifname = f'{vif_s_ifname}.{vif_c_id}'
-                vif_c_config['ifname'] = vif_c_ifname
-                c_vlan = VLANIf(vif_c_ifname, **tmp)
-                c_vlan.update(vif_c_config)
-
         # remove no longer required 802.1q VLAN interfaces
         for vif_id in config.get('vif_remove', {}):
             vif_ifname = f'{ifname}.{vif_id}'
             VLANIf(vif_ifname).remove()
 
-        # create/update 802.1q VLAN interfaces
-        for vif_id, vif_config in config.get('vif', {}).items():
-            tmp = deepcopy(VLANIf.get_config())
-            tmp['source_interface'] = ifname
-            tmp['vlan_id'] = vif_id
-
-            vif_ifname = f'{ifname}.{vif_id}'
-            vif_config['ifname'] = vif_ifname
-            vlan = VLANIf(vif_ifname, **tmp)
-            vlan.update(vif_config)
+        # create all missing VLAN interfaces at once, the VLANIf instances
+        # below will then only update them
+        self._create_vlans(config)
+
+        # create/update 802.1ad (Q-in-Q VLANs) and 802.1q VLAN interfaces,
+        # they only depend on this interface, then the client VLANs (vif-c)
+        # which depend on their vif-s
+        self._apply_vlans(
+            [partial(self._update_vif_s, vif_s_id, vif_s_config)
+                for vif_s_id, vif_s_config in config.get('vif_s', {}).items()] +
+            [partial(self._update_vif, vif_id, vif_config)
+                for vif_id, vif_config in config.get('vif', {}).items()])
+
+        self._apply_vlans(
+            [partial(self._update_vif_c, vif_s_id, vif_c_id, vif_c_config)
+                for vif_s_id, vif_s_config in config.get('vif_s', {}).items()
+                for vif_c_id, vif_c_config in vif_s_config.get('vif_c', {}).items()])
 
         self.apply_mirror()
 
@@ -14,12 +14,16 @@
 # License along with this library.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
+import json
 
 from time import time
+from tempfile import NamedTemporaryFile
 from datetime import datetime
 from functools import reduce
 from tabulate import tabulate
 
+from vyos.netlink import rtnl
+from vyos.netlink import IFF_UP
 from vyos.ifconfig import Control
 
 class Operational(Control):
@@ -27,7 +31,9 @@ class Operational(Control):
     A class able to load Interface statistics
     """
 
-    cache_magic = 'XYZZYX'
+    # the file where the counters of every interface are saved, indexed by
+    # interface name, so they can be loaded and cleared in bulk
+    cache_file = '/var/run/vyatta/interface-counters.json'
 
     _stat_names = {
         'rx': ['bytes', 'packets', 'errors', 'dropped', 'overrun', 'mcast'],
@@ -47,13 +53,15 @@ class Operational(Control):
         'oper_state':{
             'location': '/sys/class/net/{ifname}/operstate',
         },
+        # adds all the counters of an interface
+        **{stat: {
+            'location': '/sys/class/net/{ifname}/statistics/'+stat,
+        } for stat in _stats_all},
     }
 
-
-    @classmethod
-    def cachefile (cls, ifname):
-        # the file where we are saving the counters
-        return f'/var/run/vyatta/{ifname}.stats'
+    # the state and counters are read once for a command, even when it asks
+    # for them more than once
+    _sysfs_ttl = 1
 
 
     def __init__(self, ifname):
@@ -76,12 +84,6 @@ class Operational(Control):
         super().__init__(**self.config)
         self.ifname = ifname
 
-        # adds all the counters of an interface
-        for stat in self._stats_all:
-            self._sysfs_get[stat] = {
-                'location': '/sys/class/net/{ifname}/statistics/'+stat,
-            }
-
     def get_state(self):
         """
         Get interface operational state
@@ -95,6 +97,33 @@ class Operational(Control):
         # "unknown", "notpresent", "down", "lowerlayerdown", "testing", "dormant", "up"
         return self.get_interface('oper_state')
 
+    @classmethod
+    def dump(cls):
+        """
+        Return the operational and administrative state, alias, counters
+        and addresses of every interface, indexed by interface name, from a
+        single rtnetlink link and address dump (IFLA_STATS64 counters)
+
+        Example:
+        >>> from vyos.ifconfig import Operational
+        >>> Operational.dump()['eth0']['stats']['rx_bytes']
+        1673252
+        """
+        addrs = {}
+        for addr in rtnl.dump_addrs():
+            addrs.setdefault(addr['index'], []).append(addr['address'])
+
+        interfaces = {}
+        for link in rtnl.dump_links():
+            interfaces[link['ifname']] = {
+                'oper_state': link['operstate'],
+                'admin_state': 'up' if link['flags'] & IFF_UP else 'down',
+                'alias': link['alias'],
+                'stats': {k: link['stats'].get(k, 0) for k in cls._stats_all},
+                'addr': addrs.get(link['index'], []),
+            }
+        return interfaces
+
     @classmethod
     def strtime (cls, epoc):
         """
@@ -102,67 +131,109 @@ class Operational(Control):
         """
         return datetime.fromtimestamp(epoc).strftime("%a %b %d %R:%S %Z %Y")
 
-    def save_counters(self, stats):
+    @classmethod
+    def _load_cache(cls):
         """
-        record the provided stats to a file keeping vyatta compatibility
+        load the saved counters of all the interfaces
         """
+        try:
+            with open(cls.cache_file, 'r') as f:
+                cache = json.load(f)
+            return cache if isinstance(cache, dict) else {}
+        except (IOError, ValueError):
+            return {}
 
-        with open(self.cachefile(self.ifname), 'w') as f:
-            f.write(self.cache_magic)
-            f.write('\n')
-            f.write(str(int(time())))
-            f.write('\n')
-            for k,v in stats.items():
-                if v:
-                    f.write(f'{k},{v}\n')
+    @classmethod
+    def _save_cache(cls, cache):
+        """
+        atomically replace the saved counters of all the interfaces
+        """
+        directory = os.path.dirname(cls.cache_file)
+        os.makedirs(directory, exist_ok=True)
+        with NamedTemporaryFile('w', dir=directory, delete=False) as f:
+            json.dump(cache, f, separators=(',', ':'))
+        os.replace(f.name, cls.cache_file)
 
-    def load_counters(self):
+    @classmethod
+    def _counters(cls, saved):
         """
-        load the stats from a file keeping vyatta compatibility
-        return a dict() with the value for each interface counter for the cache
+        return a dict() with the value for each interface counter, and the
+        timestamp if the counters were saved, from a saved cache entry
+        """
+        stats = {name: 0 for name in cls._stats_all}
+        stats.update(saved or {})
+        return stats
+
+    @classmethod
+    def load_all_counters(cls, ifnames):
+        """
+        load the saved counters of the given interfaces with a single read
+        return a dict() of load_counters() results indexed by interface name
+        """
+        cache = cls._load_cache()
+        return {ifname: cls._counters(cache.get(ifname)) for ifname in ifnames}
+
+    @classmethod
+    def save_all_counters(cls, all_stats):
+        """
+        record the stats given per interface name with a single write
         """
-        ifname = self.config['ifname']
+        cache = cls._load_cache()
+        timestamp = int(time())
+        for ifname, stats in all_stats.items():
+            entry = {k: v for k, v in stats.items() if v and k in cls._stats_all}
+            entry['timestamp'] = timestamp
+            cache[ifname] = entry
+        cls._save_cache(cache)
 
-        stats = {}
-        no_stats = {}
-        for name in self._stats_all:
-            stats[name] = 0
-            no_stats[name] = 0
+    @classmethod
+    def clear_all_counters(cls, ifnames, counters=None):
+        clear = cls._stats_all if counters is None else []
+        all_stats = cls.load_all_counters(ifnames)
+        for stats in all_stats.values():
+            for counter, value in stats.items():
+                stats[counter] = 0 if counter in clear else value
+        cls.save_all_counters(all_stats)
 
-        try:
-            with open(self.cachefile(self.ifname),'r') as f:
-                magic = f.readline().strip()
-                if magic != self.cache_magic:
-                    print(f'bad magic {ifname}')
-                    return no_stats
-                stats['timestamp'] = f.readline().strip()
-                for line in f:
-                    k, v = line.split(',')
-                    stats[k] = int(v)
-            return stats
-        except IOError:
-            return no_stats
+    @classmethod
+    def reset_all_counters(cls, ifnames):
+        cache = cls._load_cache()
+        for ifname in ifnames:
+            cache.pop(ifname, None)
+        cls._save_cache(cache)
+
+    def save_counters(self, stats):
+        """
+        record the provided stats of the interface
+        """
+        self.save_all_counters({self.ifname: stats})
+
+    def load_counters(self):
+        """
+        load the saved stats of the interface
+        return a dict() with the value for each interface counter for the cache
+        """
+        return self.load_all_counters([self.ifname])[self.ifname]
 
     def clear_counters(self, counters=None):
-        clear = self._stats_all if counters is None else []
-        stats = self.load_counters()
-        for counter, value in stats.items():
-            stats[counter] = 0 if counter in clear else value
-        self.save_counters(stats)
+        self.clear_all_counters([self.ifname], counters)
 
     def reset_counters(self):
-        os.remove(self.cachefile(self.ifname))
+        self.reset_all_counters([self.ifname])
 
     def get_stats(self):
-        """ return a dict() with the value for each interface counter """
-        stats = {}
-        for counter in self._stats_all:
-            stats[counter] = int(self.get_interface(counter))
-        return stats
+        """
+        return a dict() with the value for each interface counter, all read
+        from the IFLA_STATS64 attribute of a single rtnetlink request; the
+        counters the kernel does not report are 0
+        """
+        stats = rtnl.get_link(self.ifname)['stats']
+        return {counter: stats.get(counter, 0) for counter in self._stats_all}
 
-    def formated_stats(self, indent=4):
+    def formated_stats(self, indent=4, stats=None):
         tabs = []
-        stats = self.get_stats()
+        if stats is None:
+            stats = self.get_stats()
         for rtx in self._stats_dir:
             tabs.append([f'{rtx.upper()}:', ] + [_ for _ in self._stat_names[rtx]])
             tabs.append(['', ] + [stats[_] for _ in self._stats_dir[rtx]])
@@ -13,8 +13,17 @@
 # You should have received a copy of the GNU Lesser General Public
 # License along with this library.  If not, see <http://www.gnu.org/licenses/>.
 
+import os
 import re
-import netifaces
+import json
+import socket
+import hashlib
+import tempfile
+
+from vyos.netlink import LinkMonitor
+
+# the interface index shared between processes, see _interface_index()
+index_file = '/run/vyos-interface-index.json'
 
 
 class Section:
@@ -22,6 +31,10 @@ class Section:
     _prefixes = {}
     _classes = []
 
+    # the interfaces of the system, see _interface_index()
+    _index = None
+    _monitor = LinkMonitor()
+
     # class need to define: definition['prefixes']
     # the interface prefixes declared by a class used to name interface with
     # prefix[0-9]*(\.[0-9]+)?(\.[0-9]+)?, such as lo, eth0 or eth0.1.2
@@ -37,6 +50,7 @@ class Section:
             raise RuntimeError(f'valid interface prefixes not defined for {klass.__name__}')
 
         cls._classes.append(klass)
+        Section._index = None
 
         for ifprefix in klass.definition['prefixes']:
             if ifprefix in cls._prefixes:
@@ -85,23 +99,79 @@ class Section:
             return cls._prefixes[name]
         raise ValueError(f'No type found for interface name: {name}')
 
+    @classmethod
+    def _interface_index(cls):
+        """
+        return the index of the interfaces of the system which are under a
+        section: the sorted names of all of them and per section. Within a
+        process it is only looked at again after the kernel notified a link
+        change. It is shared with the other processes (such as completion
+        scripts) through index_file, keyed by the links of a single netlink
+        dump and the registered prefixes, so it is only rebuilt when they
+        changed.
+        """
+        if not Section._monitor.changed() and Section._index is not None:
+            return Section._index
+
+        links = socket.if_nameindex()
+        key = hashlib.sha256(json.dumps([links, sorted(cls._prefixes)]).encode()).hexdigest()
+        if Section._index is not None and Section._index['key'] == key:
+            return Section._index
+
+        index = cls._load_index(key)
+        if index is None:
+            names = cls._sort_interfaces(ifname for _, ifname in links
+                                         if cls.section(ifname))
+            sections = {}
+            for ifname in names:
+                sections.setdefault(cls.section(ifname), []).append(ifname)
+
+            index = {
+                'key': key,
+                'interfaces': names,
+                'sections': sections,
+            }
+            cls._store_index(index)
+
+        Section._index = index
+        return index
+
+    @classmethod
+    def _load_index(cls, key):
+        try:
+            with open(index_file, 'r') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(index, dict) or index.get('key') != key:
+            return None
+        return index
+
+    @classmethod
+    def _store_index(cls, index):
+        try:
+            with tempfile.NamedTemporaryFile('w', dir=os.path.dirname(index_file),
+                                             delete=False) as f:
+                json.dump(index, f)
+            os.chmod(f.name, 0o644)
+            os.replace(f.name, index_file)
+        except OSError:
+            # the index file is an optimization only - e.g. not running as root
+            pass
+
     @classmethod
     def _intf_under_section (cls,section=''):
         """
         return a generator with the name of the configured interface
         which are under a section
         """
-        interfaces = netifaces.interfaces()
-
-        for ifname in interfaces:
-            ifsection = cls.section(ifname)
-            if not ifsection:
-                continue
-
-            if section and ifsection != section:
-                continue
+        index = cls._interface_index()
+        if not section:
+            yield from index['interfaces']
+        else:
+            yield from index['sections'].get(section, [])
 
-            yield ifname
+    _sort_split = re.compile(r'([^0-9]+)([0-9]+)[.]?([0-9]+)?[.]?([0-9]+)?')
 
     @classmethod
     def _sort_interfaces(cls, generator):
@@ -110,7 +180,7 @@ class Section:
         """
         def key(ifname):
             value = 0
-            parts = re.split(r'([^0-9]+)([0-9]+)[.]?([0-9]+)?[.]?([0-9]+)?', ifname)
+            parts = cls._sort_split.split(ifname)
             length = len(parts)
             name = parts[1] if length >= 3 else parts[0]
             # the +1 makes sure eth0.0.0 after eth0.0
@@ -139,7 +209,7 @@ class Section:
         if no section is provided, then it returns all configured interfaces
         """
 
-        return cls._sort_interfaces(cls._intf_under_section(section))
+        return list(cls._intf_under_section(section))
 
     @classmethod
     def _intf_with_feature(cls, feature=''):
@@ -0,0 +1,355 @@
+# Copyright 2020 VyOS maintainers and contributors <maintainers@vyos.io>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Minimal rtnetlink client, used to query and change links and addresses
+without spawning iproute2 for every operation.
+
+Example:
+>>> from vyos.netlink import rtnl
+>>> rtnl.get_link('lo')['mtu']
+65536
+>>> rtnl.set_link('eth0', state='up', mtu=1500)
+>>> rtnl.add_addr('eth0', '192.0.2.1/24', broadcast=True)
+"""
+
+import os
+import errno
+import socket
+import struct
+import threading
+
+from ipaddress import ip_interface
+
+# include/uapi/linux/netlink.h
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+
+NLM_F_REQUEST = 0x01
+NLM_F_MULTI = 0x02
+NLM_F_ACK = 0x04
+NLM_F_DUMP = 0x300
+NLM_F_EXCL = 0x200
+NLM_F_CREATE = 0x400
+
+NLA_TYPE_MASK = 0x3fff
+
+# include/uapi/linux/rtnetlink.h (legacy multicast groups)
+RTMGRP_LINK = 0x1
+
+# include/uapi/linux/rtnetlink.h
+RTM_NEWLINK = 16
+RTM_GETLINK = 18
+RTM_NEWADDR = 20
+RTM_DELADDR = 21
+RTM_GETADDR = 22
+
+# include/uapi/linux/if_link.h
+IFLA_ADDRESS = 1
+IFLA_IFNAME = 3
+IFLA_MTU = 4
+IFLA_MASTER = 10
+IFLA_OPERSTATE = 16
+IFLA_IFALIAS = 20
+IFLA_STATS64 = 23
+IFLA_MIN_MTU = 50
+IFLA_MAX_MTU = 51
+
+# include/uapi/linux/if_addr.h
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+IFA_LABEL = 3
+IFA_BROADCAST = 4
+
+# IF_OPER_* as named in /sys/class/net/<ifname>/operstate
+OPERSTATES = ['unknown', 'notpresent', 'down', 'lowerlayerdown',
+              'testing', 'dormant', 'up']
+
+# struct rtnl_link_stats64, newer kernels may append fields
+STATS64 = [
+    'rx_packets', 'tx_packets', 'rx_bytes', 'tx_bytes',
+    'rx_errors', 'tx_errors', 'rx_dropped', 'tx_dropped',
+    'multicast', 'collisions', 'rx_length_errors', 'rx_over_errors',
+    'rx_crc_errors', 'rx_frame_errors', 'rx_fifo_errors', 'rx_missed_errors',
+    'tx_aborted_errors', 'tx_carrier_errors', 'tx_fifo_errors',
+    'tx_heartbeat_errors', 'tx_window_errors', 'rx_compressed',
+    'tx_compressed', 'rx_nohandler',
+]
+
+# include/uapi/linux/if.h
+IFF_UP = 0x1
+
+_nlmsghdr = struct.Struct('=LHHLL')
+_nlmsgerr = struct.Struct('=i')
+_ifinfomsg = struct.Struct('=BxHiII')
+_ifaddrmsg = struct.Struct('=BBBBI')
+_rtattr = struct.Struct('=HH')
+_u32 = struct.Struct('=I')
+
+
+def _align(length):
+    return (length + 3) & ~3
+
+def _attr(kind, data):
+    """ encode a single rtattr, padded to the netlink alignment """
+    attr = _rtattr.pack(_rtattr.size + len(data), kind) + data
+    return attr + b'\0' * (_align(len(attr)) - len(attr))
+
+def _attrs(data, offset=0):
+    """ decode the rtattrs found in data from offset into a dict """
+    attrs = {}
+    while offset + _rtattr.size <= len(data):
+        length, kind = _rtattr.unpack_from(data, offset)
+        if length < _rtattr.size:
+            break
+        attrs[kind & NLA_TYPE_MASK] = data[offset + _rtattr.size:offset + length]
+        offset += _align(length)
+    return attrs
+
+def _index(ifname):
+    """ interface index of ifname, 0 (none) for an empty name """
+    return socket.if_nametoindex(ifname) if ifname else 0
+
+def _mac(data):
+    return ':'.join(f'{b:02x}' for b in data)
+
+def _string(data):
+    return data.rstrip(b'\0').decode()
+
+def _stats64(data):
+    count = min(len(data) // 8, len(STATS64))
+    return dict(zip(STATS64, struct.unpack_from(f'={count}Q', data)))
+
+
+class RTNetlink:
+    """
+    A single, lazily opened NETLINK_ROUTE socket shared by all callers of
+    the process. Requests are serialised, errors reported by the kernel are
+    raised as OSError, as vyos.util.cmd() does for failing commands.
+    """
+    def __init__(self):
+        self._sock = None
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def _socket(self):
+        if not self._sock:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW,
+                                 socket.NETLINK_ROUTE)
+            sock.bind((0, 0))
+            self._sock = sock
+        return self._sock
+
+    def request(self, kind, flags, payload):
+        """
+        Send one request and return the list of (type, payload) messages of
+        the answer, waiting for the acknowledgement or end of dump
+        """
+        flags |= NLM_F_REQUEST
+        with self._lock:
+            sock = self._socket()
+            self._seq += 1
+            seq = self._seq
+            sock.send(_nlmsghdr.pack(_nlmsghdr.size + len(payload), kind,
+                                     flags, seq, 0) + payload)
+
+            answer = []
+            while True:
+                data = sock.recv(65536)
+                offset = 0
+                while offset + _nlmsghdr.size <= len(data):
+                    length, mtype, mflags, mseq, _ = _nlmsghdr.unpack_from(data, offset)
+                    body = data[offset + _nlmsghdr.size:offset + length]
+                    offset += _align(length)
+                    if mseq != seq:
+                        continue
+                    if mtype == NLMSG_DONE:
+                        return answer
+                    if mtype == NLMSG_ERROR:
+                        code, = _nlmsgerr.unpack_from(body)
+                        if code:
+                            raise OSError(-code, os.strerror(-code))
+                        return answer
+                    answer.append((mtype, body))
+                    if not mflags & NLM_F_MULTI and not flags & NLM_F_ACK:
+                        return answer
+
+    @staticmethod
+    def _link(body):
+        _, _, index, flags, _ = _ifinfomsg.unpack_from(body)
+        attrs = _attrs(body, _ifinfomsg.size)
+        u32 = lambda kind: _u32.unpack(attrs[kind])[0] if kind in attrs else None
+        operstate = attrs.get(IFLA_OPERSTATE, b'\0')[0]
+        return {
+            'index': index,
+            'ifname': _string(attrs.get(IFLA_IFNAME, b'')),
+            'flags': flags,
+            'address': _mac(attrs.get(IFLA_ADDRESS, b'')),
+            'mtu': u32(IFLA_MTU),
+            'min_mtu': u32(IFLA_MIN_MTU),
+            'max_mtu': u32(IFLA_MAX_MTU),
+            'master': u32(IFLA_MASTER),
+            'operstate': OPERSTATES[operstate] if operstate < len(OPERSTATES) else 'unknown',
+            'alias': _string(attrs.get(IFLA_IFALIAS, b'')),
+            'stats': _stats64(attrs[IFLA_STATS64]) if IFLA_STATS64 in attrs else {},
+        }
+
+    def get_link(self, ifname):
+        """
+        Return the link information of ifname as a dict with the keys index,
+        ifname, flags, address, mtu, min_mtu, max_mtu and master (an index)
+        """
+        payload = _ifinfomsg.pack(socket.AF_UNSPEC, 0, _index(ifname), 0, 0)
+        for _, body in self.request(RTM_GETLINK, 0, payload):
+            return self._link(body)
+
+    def dump_links(self):
+        """
+        Return the link information, as get_link() does, of all the
+        interfaces from a single dump
+        """
+        payload = _ifinfomsg.pack(socket.AF_UNSPEC, 0, 0, 0, 0)
+        return [self._link(body) for _, body in
+                self.request(RTM_GETLINK, NLM_F_DUMP, payload)]
+
+    def dump_addrs(self):
+        """
+        Return the addresses of all the interfaces from a single dump, as a
+        list of dicts with the keys index, family, address (with prefix
+        length), scope and label
+        """
+        addrs = []
+        payload = _ifaddrmsg.pack(socket.AF_UNSPEC, 0, 0, 0, 0)
+        for _, body in self.request(RTM_GETADDR, NLM_F_DUMP, payload):
+            family, prefixlen, _, scope, index = _ifaddrmsg.unpack_from(body)
+            attrs = _attrs(body, _ifaddrmsg.size)
+            # IFA_ADDRESS is the peer on point-to-point links
+            local = attrs.get(IFA_LOCAL, attrs.get(IFA_ADDRESS))
+            if local is None:
+                continue
+            addrs.append({
+                'index': index,
+                'family': family,
+                'address': f'{socket.inet_ntop(family, local)}/{prefixlen}',
+                'scope': scope,
+                'label': _string(attrs.get(IFA_LABEL, b'')),
+            })
+        return addrs
+
+    def set_link(self, ifname, state=None, address=None, mtu=None, master=None):
+        """
+        Change the link attributes of ifname in a single request, the way
+        'ip link set' does. The state is 'up' or 'down', master is the name
+        of a bridge, bond or VRF and an empty string removes the link from
+        its master.
+        """
+        flags = change = 0
+        if state is not None:
+            change = IFF_UP
+            flags = IFF_UP if state == 'up' else 0
+
+        attrs = b''
+        if address is not None:
+            attrs += _attr(IFLA_ADDRESS, bytes.fromhex(address.replace(':', '')))
+        if mtu is not None:
+            attrs += _attr(IFLA_MTU, _u32.pack(int(mtu)))
+        if master is not None:
+            attrs += _attr(IFLA_MASTER, _u32.pack(_index(master)))
+
+        payload = _ifinfomsg.pack(socket.AF_UNSPEC, 0, _index(ifname),
+                                  flags, change) + attrs
+        self.request(RTM_NEWLINK, NLM_F_ACK, payload)
+
+    def _addr_request(self, kind, flags, ifname, addr, broadcast=False):
+        interface = ip_interface(addr)
+        family = socket.AF_INET if interface.version == 4 else socket.AF_INET6
+        local = interface.ip.packed
+
+        attrs = _attr(IFA_LOCAL, local) + _attr(IFA_ADDRESS, local)
+        # the equivalent of 'brd +', only set for networks with broadcasts
+        if broadcast and interface.version == 4 and interface.network.prefixlen <= 30:
+            attrs += _attr(IFA_BROADCAST, interface.network.broadcast_address.packed)
+
+        payload = _ifaddrmsg.pack(family, interface.network.prefixlen, 0, 0,
+                                  _index(ifname)) + attrs
+        self.request(kind, flags | NLM_F_ACK, payload)
+
+    def add_addr(self, ifname, addr, broadcast=False):
+        """ Add the address addr (with prefix length) to ifname """
+        self._addr_request(RTM_NEWADDR, NLM_F_CREATE | NLM_F_EXCL, ifname,
+                           addr, broadcast)
+
+    def del_addr(self, ifname, addr):
+        """ Delete the address addr (with prefix length) from ifname """
+        self._addr_request(RTM_DELADDR, 0, ifname, addr)
+
+    def flush_addr(self, ifname):
+        """ Delete all the addresses of ifname, as 'ip addr flush' does """
+        index = _index(ifname)
+        payload = _ifaddrmsg.pack(socket.AF_UNSPEC, 0, 0, 0, 0)
+        for _, body in self.request(RTM_GETADDR, NLM_F_DUMP, payload):
+            if _ifaddrmsg.unpack_from(body)[4] != index:
+                continue
+            try:
+                self.request(RTM_DELADDR, NLM_F_ACK, body)
+            except OSError as e:
+                # secondary addresses go away with their primary address
+                if e.errno != errno.EADDRNOTAVAIL:
+                    raise
+
+
+class LinkMonitor:
+    """
+    Tell whether links changed (were added, removed, renamed or changed
+    state) since the previous call, from the RTMGRP_LINK notifications queued
+    on a non-blocking socket. No thread is involved, the queue is drained on
+    each call, under a lock as threads may share the monitor.
+    """
+    def __init__(self):
+        self._sock = None
+        self._lock = threading.Lock()
+
+    def changed(self):
+        with self._lock:
+            return self._changed()
+
+    def _changed(self):
+        if not self._sock:
+            try:
+                sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW,
+                                     socket.NETLINK_ROUTE)
+                sock.bind((0, RTMGRP_LINK))
+                sock.setblocking(False)
+                self._sock = sock
+            except OSError:
+                pass
+            # nothing is known about the time before the subscription
+            return True
+
+        changed = False
+        while True:
+            try:
+                if not self._sock.recv(65536):
+                    break
+                changed = True
+            except BlockingIOError:
+                break
+            except OSError:
+                # ENOBUFS, the queue overflowed and notifications were lost
+                changed = True
+        return changed
+
+
+rtnl = RTNetlink()
@@ -17,21 +17,37 @@ from vyos.xml import load
 from vyos.xml import kw
 
 
-def load_configuration(cache=[]):
+def load_configuration(cache=[], lazy=True):
+    """
+    returns the configuration definition, loaded from (in order of preference)
+    - the binary cache, only if lazy is set: subtrees are loaded on first use
+    - the python cache: everything is loaded at import
+    - the XML files
+    the definition is loaded once per process, lazy only matters on first call
+    """
     if cache:
         return cache[0]
 
-    xml = definition.XML()
+    xml = None
 
-    try:
-        from vyos.xml.cache import configuration
-        xml.update(configuration.definition)
-        cache.append(xml)
-    except Exception:
-        xml = definition.XML()
-        print('no xml configuration cache')
-        xml.update(load.xml(load.configuration_definition))
+    if lazy:
+        try:
+            from vyos.xml import lazy as binary
+            xml = binary.load(load.configuration_binary)
+        except Exception:
+            xml = None
 
+    if xml is None:
+        xml = definition.XML()
+        try:
+            from vyos.xml.cache import configuration
+            xml.update(configuration.definition)
+        except Exception:
+            xml = definition.XML()
+            print('no xml configuration cache')
+            xml.update(load.xml(load.configuration_definition))
+
+    cache.append(xml)
     return xml
 
 
@@ -12,6 +12,7 @@
 # if not, write to the Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA 
 
 from vyos.xml import kw
+from vyos.dicts import CopyOnWriteDict
 
 # As we index by key, the name is first and then the data:
 # {'dummy': {
@@ -29,6 +30,7 @@ class XML(dict):
         self[kw.priorities] = {}
         self[kw.owners] = {}
         self[kw.default] = {}
+        self[kw.mangled_default] = {}
         self[kw.tags] = []
 
         dict.__init__(self)
@@ -53,6 +55,8 @@ class XML(dict):
         self.extra = False
         # what kind of node are we in plain vs data not
         self.plain = True
+        # flat index of the schema tree, see _schema_index()
+        self._index = None
 
     def reset(self):
         self.tree = self[kw.tree]
@@ -244,27 +248,52 @@ class XML(dict):
         print("plain   " + str(self.plain))
         print("options " + str(self.options))
 
-    # from functools import lru_cache
-    # @lru_cache(maxsize=100)
-    # XXX: need to use cachetool instead - for later
+    def _mangled_defaults(self, lpath):
+        """
+        returns the (shared) mangled defaults dict of lpath, computing and
+        remembering it and the ones of all the paths below if needed
+        """
+        key = ' '.join(lpath)
+        cache = self[kw.mangled_default]
+        if key in cache:
+            return cache[key]
 
-    def defaults(self, lpath, flat):
         d = self[kw.default]
         for k in lpath:
             d = d.get(k, {})
 
+        # _flatten will make this conversion
+        d = self.multi_to_list(lpath, d, defaults=True)
+
+        r = {}
+        for k in d:
+            under = k.replace('-','_')
+            if isinstance(d[k],dict):
+                r[under] = self._mangled_defaults(lpath + [k])
+                continue
+            r[under] = d[k]
+
+        # paths without default values (e.g. containing tagNode values)
+        # are not remembered, the cache would grow with every lookup
+        if r:
+            cache[key] = r
+        return r
+
+    def mangle_defaults(self):
+        """
+        precompute the mangled defaults for every path of the default tree
+        """
+        self[kw.mangled_default] = {}
+        self._mangled_defaults([])
+
+    def defaults(self, lpath, flat):
         if not flat:
-            # _flatten will make this conversion
-            d = self.multi_to_list(lpath, d, defaults=True)
+            # the result is shared between all callers, only hand out views
+            return CopyOnWriteDict(self._mangled_defaults(lpath))
 
-            r = {}
-            for k in d:
-                under = k.replace('-','_')
-                if isinstance(d[k],dict):
-                    r[under] = self.defaults(lpath + [k], flat)
-                    continue
-                r[under] = d[k]	
-            return r
+        d = self[kw.default]
+        for k in lpath:
+            d = d.get(k, {})
 
         def _flatten(inside, index, d):
             r = {}
@@ -285,18 +314,24 @@ class XML(dict):
         return _flatten(lpath, len(lpath), d)
 
     def multi_to_list(self, lpath, conf, defaults=False):
+        tree, tag = self._walk(self[kw.tree], False, lpath)
+        return self._multi_to_list(tree, tag, conf, defaults)
+
+    def _multi_to_list(self, tree, tag, conf, defaults):
+        # the position in the schema tree is carried along the recursion,
+        # so every node is only looked up once
         r = {}
         for k in conf:
             # key mangling could also be done here
             # it would prevent two parsing of the config tree
             # under = k.replace('-','_')
             under = k
-            fpath = lpath + [k]
+            ktree, ktag = self._step(tree, tag, k)
             if isinstance(conf[k],dict):
-                r[under] = self.multi_to_list(fpath, conf[k], defaults)
+                r[under] = self._multi_to_list(ktree, ktag, conf[k], defaults)
                 continue
             value = conf[k]
-            if self.is_multi(fpath) and not isinstance(value, list):
+            if ktree is not None and ktree.get(kw.multi) is True and not isinstance(value, list):
                 if not defaults:
                     value = [value]
                 else:
@@ -304,9 +339,47 @@ class XML(dict):
             r[under] = value
         return r
 
-    # from functools import lru_cache
-    # @lru_cache(maxsize=100)
-    # XXX: need to use cachetool instead - for later
+    def _step(self, tree, tag, word):
+        """
+        moves one word along a configuration path (with tagNode names),
+        returns the new (tree, tag) position; tree is None once the path
+        left the schema and tag is set if the next word is a tagNode name
+        """
+        if tree is None:
+            return None, False
+        if tag:
+            return tree, False
+        if word not in tree:
+            return None, False
+        tree = tree[word]
+        return tree, tree[kw.node] == kw.tagNode
+
+    def _walk(self, tree, tag, lpath):
+        for word in lpath:
+            tree, tag = self._step(tree, tag, word)
+            if tree is None:
+                break
+        return tree, tag
+
+    def _schema_index(self):
+        """
+        returns a flat dict of all the nodes of the tree, indexed by the
+        tuple of their schema path (without tagNode names)
+        """
+        if self._index is not None:
+            return self._index
+
+        index = {}
+        def _compile(path, tree):
+            index[path] = tree
+            for k, inner in tree.items():
+                if kw.found(k) or not isinstance(inner, dict):
+                    continue
+                _compile(path + (k,), inner)
+
+        _compile((), self[kw.tree])
+        self._index = index
+        return index
 
     def _tree(self, lpath, with_tag=True):
         """
@@ -314,15 +387,9 @@ class XML(dict):
         if with_tag is set, this is a configuration path (with tagNode names)
         and tag name will be removed from the path when traversing the tree
         """
-        tree = self[kw.tree]
-        spath = lpath.copy()
-        while spath:
-            p = spath.pop(0)
-            if p not in tree:
-                return None
-            tree = tree[p]
-            if with_tag and spath and tree[kw.node] == kw.tagNode:
-                spath.pop(0)
+        if not with_tag:
+            return self._schema_index().get(tuple(lpath))
+        tree, _ = self._walk(self[kw.tree], False, lpath)
         return tree
 
     def _get(self, lpath, tag, with_tag=True):
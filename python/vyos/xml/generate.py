@@ -21,6 +21,7 @@ import argparse
 
 from vyos.xml import kw
 from vyos.xml import load
+from vyos.xml import lazy
 
 
 # import json
@@ -42,6 +43,7 @@ def main():
     parser = argparse.ArgumentParser(description='generate python file from xml defintions')
     parser.add_argument('--conf-folder', type=str, default=load.configuration_definition, help='XML interface definition folder')
     parser.add_argument('--conf-cache', type=str, default=load.configuration_cache, help='python file with the conf mode dict')
+    parser.add_argument('--conf-binary', type=str, default=load.configuration_binary, help='binary file with the lazily loaded conf mode dict')
 
     # parser.add_argument('--op-folder', type=str, default=load.operational_definition, help='XML interface definition folder')
     # parser.add_argument('--op-cache', type=str, default=load.operational_cache, help='python file with the conf mode dict')
@@ -52,6 +54,8 @@ def main():
 
     if os.path.exists(load.configuration_cache):
         os.remove(load.configuration_cache)
+    if os.path.exists(load.configuration_binary):
+        os.remove(load.configuration_binary)
     # if os.path.exists(load.operational_cache):
 	#     os.remove(load.operational_cache)
 
@@ -63,6 +67,7 @@ def main():
         return
 
     save_dict(args.conf_cache, conf)
+    lazy.save(args.conf_binary, conf)
     # save_dict(args.op_cache, op)
 
 
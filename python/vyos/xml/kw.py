@@ -33,6 +33,7 @@ priorities = '[priorities]'
 owners = '[owners]'
 tags = '[tags]'
 default = '[default]'
+mangled_default = '[mangled_default]'
 
 # nodes
 
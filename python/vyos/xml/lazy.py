@@ -0,0 +1,142 @@
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This library is free software; you can redistribute it and/or modify it under the terms of
+# the GNU Lesser General Public License as published by the Free Software Foundation;
+# either version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License along with this library;
+# if not, write to the Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+# A binary form of the definition cache which is loaded lazily.
+#
+# The top of the tree is pickled with the subtrees of the first levels
+# (e.g. 'interfaces' and 'interfaces ethernet') replaced by references to
+# separately pickled blobs. The file is memory-mapped and a blob is only
+# unpickled when the subtree is first accessed, so a command working on
+# 'interfaces ethernet' never materializes the firewall or VPN definitions.
+#
+# file layout: <header length: 8 bytes> <header pickle> <blob> <blob> ...
+
+import mmap
+import pickle
+import struct
+
+from vyos.xml import kw
+from vyos.xml import definition
+
+
+# number of tree levels loaded lazily
+depth = 2
+
+_length = struct.Struct('!Q')
+
+
+class Stub(int):
+    """
+    reference to a pickled subtree, by index in the blob table
+    """
+    pass
+
+
+class LazyTree(dict):
+    """
+    a tree node loading its children on first access
+    """
+    def __init__(self, tree, load):
+        super().__init__(tree)
+        self._load = load
+
+    def _resolve(self, k):
+        v = dict.__getitem__(self, k)
+        if isinstance(v, Stub):
+            v = self._load(v)
+            dict.__setitem__(self, k, v)
+        return v
+
+    def __getitem__(self, k):
+        return self._resolve(k)
+
+    def __iter__(self):
+        # defeat the CPython fast path in dict(d), which would copy stubs
+        return iter(dict.keys(self))
+
+    def get(self, k, default=None):
+        if k in self:
+            return self._resolve(k)
+        return default
+
+    def values(self):
+        return [self._resolve(k) for k in dict.keys(self)]
+
+    def items(self):
+        return [(k, self._resolve(k)) for k in dict.keys(self)]
+
+
+def save(fname, xml):
+    """
+    write the binary form of the XML definition to fname
+    """
+    blobs = []
+
+    def _stub(tree, level):
+        r = {}
+        for k, v in tree.items():
+            if level < depth and not kw.found(k) and isinstance(v, dict):
+                blob = pickle.dumps(_stub(v, level + 1), pickle.HIGHEST_PROTOCOL)
+                r[k] = Stub(len(blobs))
+                blobs.append(blob)
+                continue
+            r[k] = v
+        return r
+
+    tree = _stub(xml[kw.tree], 0)
+
+    offsets = []
+    offset = 0
+    for blob in blobs:
+        offsets.append((offset, len(blob)))
+        offset += len(blob)
+
+    header = {
+        'definition': {k: v for k, v in xml.items() if k != kw.tree},
+        'tree': tree,
+        'blobs': offsets,
+    }
+    data = pickle.dumps(header, pickle.HIGHEST_PROTOCOL)
+
+    with open(fname, 'wb') as w:
+        print(f'saving {fname}')
+        w.write(_length.pack(len(data)))
+        w.write(data)
+        for blob in blobs:
+            w.write(blob)
+
+
+def load(fname):
+    """
+    returns the XML definition of fname, with a lazily loaded tree
+    """
+    with open(fname, 'rb') as r:
+        # the mapping stays valid after the file is closed
+        mm = mmap.mmap(r.fileno(), 0, access=mmap.ACCESS_READ)
+
+    start = _length.size
+    size, = _length.unpack_from(mm, 0)
+    header = pickle.loads(mm[start:start + size])
+    start += size
+    offsets = header['blobs']
+
+    def _load(index):
+        offset, length = offsets[index]
+        offset += start
+        return LazyTree(pickle.loads(mm[offset:offset + length]), _load)
+
+    xml = definition.XML()
+    xml.update(header['definition'])
+    xml[kw.tree] = LazyTree(header['tree'], _load)
+    xml.reset()
+    return xml
@@ -30,6 +30,7 @@ _here = dirname(__file__)
 
 configuration_definition = abspath(join(_here, '..', '..' ,'..', 'interface-definitions'))
 configuration_cache = abspath(join(_here, 'cache', 'configuration.py'))
+configuration_binary = abspath(join(_here, 'cache', 'configuration.pickle'))
 
 operational_definition = abspath(join(_here, '..', '..' ,'..', 'op-mode-definitions'))
 operational_cache = abspath(join(_here, 'cache', 'operational.py'))
@@ -287,4 +288,5 @@ def xml(folder):
     # as we moved all the name "up" the chain to use them as index.
     xml[kw.tree][kw.node] = kw.plainNode
     # XXX: do the others
+    xml.mangle_defaults()
     return xml
@@ -276,4 +276,19 @@ class TestSearch(TestCase):
         self.assertEqual(self.xml.filled, True)
         self.assertEqual(self.xml.plain, False)
 
-    # Need to add a check for a valuless leafNode
\ No newline at end of file
+    # Need to add a check for a valuless leafNode
+
+class TestDefaults(TestCase):
+    def setUp(self):
+        self.xml = load_configuration()
+
+    def test_defaults_are_not_shared(self):
+        first = self.xml.defaults(['interfaces', 'ethernet'], False)
+        del first['vif']
+        first['ip']['arp_cache_timeout'] = '60'
+        second = self.xml.defaults(['interfaces', 'ethernet'], False)
+        self.assertIn('vif', second)
+        self.assertEqual(second['ip']['arp_cache_timeout'], '30')
+
+    def test_defaults_tag_value(self):
+        self.assertEqual(self.xml.defaults(['interfaces', 'ethernet', 'eth0'], False), {})
@@ -25,6 +25,7 @@ import netifaces
 
 from vyos.ifconfig import Section
 from vyos.ifconfig import Interface
+from vyos.ifconfig import Operational
 from vyos.ifconfig import VRRP
 from vyos.util import cmd
 
@@ -107,6 +108,19 @@ def split_text(text, used=0):
     yield line[1:]
 
 
+def ip_show(command):
+    """
+    run an iproute2 show command once for all the interfaces and return its
+    output split by interface name (before any @lower or : suffix)
+    """
+    blocks = {}
+    for block in re.split(r'^(?=\S)', cmd(command), flags=re.M):
+        found = re.match(r'(?:\d+:\s+)?([^\s:@]+)', block)
+        if found:
+            blocks[found.group(1)] = block.rstrip('\n')
+    return blocks
+
+
 def get_vrrp_intf():
     return [intf for intf in Section.interfaces() if intf.is_vrrp()]
 
@@ -162,14 +176,24 @@ def pppoe(ifname):
 @register('show')
 def run_show_intf(ifnames, iftypes, vif, vrrp):
     handled = []
-    for interface in filtered_interfaces(ifnames, iftypes, vif, vrrp):
+    links = Operational.dump()
+    addrs = ip_show('ip addr show')
+    tunnels = None
+    interfaces = list(filtered_interfaces(ifnames, iftypes, vif, vrrp))
+    caches = Operational.load_all_counters([_.ifname for _ in interfaces])
+    for interface in interfaces:
+        if interface.ifname not in links or interface.ifname not in addrs:
+            continue
         handled.append(interface.ifname)
-        cache = interface.operational.load_counters()
+        link = links[interface.ifname]
+        cache = caches[interface.ifname]
 
-        out = cmd(f'ip addr show {interface.ifname}')
+        out = addrs[interface.ifname]
         out = re.sub(f'^\d+:\s+','',out)
         if re.search("link/tunnel6", out):
-            tunnel = cmd(f'ip -6 tun show {interface.ifname}')
+            if tunnels is None:
+                tunnels = ip_show('ip -6 tun show')
+            tunnel = tunnels.get(interface.ifname, '')
             # tun0: ip/ipv6 remote ::2 local ::1 encaplimit 4 hoplimit 64 tclass inherit flowlabel inherit (flowinfo 0x00000000)
             tunnel = re.sub('.*encap', 'encap', tunnel)
             out = re.sub('(\n\s+)(link/tunnel6)', f'\g<1>{tunnel}\g<1>\g<2>', out)
@@ -181,12 +205,12 @@ def run_show_intf(ifnames, iftypes, vif, vrrp):
             when = interface.operational.strtime(timestamp)
             print(f'    Last clear: {when}')
 
-        description = interface.get_alias()
+        description = link['alias']
         if description:
             print(f'    Description: {description}')
 
         print()
-        print(interface.operational.formated_stats())
+        print(interface.operational.formated_stats(stats=link['stats']))
 
     for ifname in ifnames:
         if ifname not in handled and ifname.startswith('pppoe'):
@@ -210,18 +234,22 @@ def run_show_intf_brief(ifnames, iftypes, vif, vrrp):
     print(format1 % ("---------", "----------", "---", "-----------"))
 
     handled = []
+    links = Operational.dump()
     for interface in filtered_interfaces(ifnames, iftypes, vif, vrrp):
+        if interface.ifname not in links:
+            continue
         handled.append(interface.ifname)
+        link = links[interface.ifname]
 
-        oper_state = interface.operational.get_state()
-        admin_state = interface.get_admin_state()
+        oper_state = link['oper_state']
+        admin_state = link['admin_state']
 
         intf = [interface.ifname,]
 
         oper = ['u', ] if oper_state in ('up', 'unknown') else ['D', ]
         admin = ['u', ] if admin_state in ('up', 'unknown') else ['A', ]
-        addrs = [_ for _ in interface.get_addr() if not _.startswith('fe80::')] or ['-', ]
-        descs = list(split_text(interface.get_alias(),0))
+        addrs = [_ for _ in link['addr'] if not _.startswith('fe80::')] or ['-', ]
+        descs = list(split_text(link['alias'],0))
 
         while intf or oper or admin or addrs or descs:
             i = intf.pop(0) if intf else ''
@@ -252,14 +280,19 @@ def run_show_counters(ifnames, iftypes, vif, vrrp):
     formating = '%-12s %10s %10s     %10s %10s'
     print(formating % ('Interface', 'Rx Packets', 'Rx Bytes', 'Tx Packets', 'Tx Bytes'))
 
-    for interface in filtered_interfaces(ifnames, iftypes, vif, vrrp):
-        oper = interface.operational.get_state()
+    links = Operational.dump()
+    interfaces = list(filtered_interfaces(ifnames, iftypes, vif, vrrp))
+    caches = Operational.load_all_counters([_.ifname for _ in interfaces])
+    for interface in interfaces:
+        if interface.ifname not in links:
+            continue
+        link = links[interface.ifname]
 
-        if oper not in ('up','unknown'):
+        if link['oper_state'] not in ('up','unknown'):
             continue
 
-        stats = interface.operational.get_stats()
-        cache = interface.operational.load_counters()
+        stats = link['stats']
+        cache = caches[interface.ifname]
         print(formating % (
             interface.ifname,
             get_counter_val(cache['rx_packets'], stats['rx_packets']),
@@ -271,15 +304,17 @@ def run_show_counters(ifnames, iftypes, vif, vrrp):
 
 @register('clear')
 def run_clear_intf(ifnames, iftypes, vif, vrrp):
+    cleared = []
     for interface in filtered_interfaces(ifnames, iftypes, vif, vrrp):
         print(f'Clearing {interface.ifname}')
-        interface.operational.clear_counters()
+        cleared.append(interface.ifname)
+    Operational.clear_all_counters(cleared)
 
 
 @register('reset')
 def run_reset_intf(ifnames, iftypes, vif, vrrp):
-    for interface in filtered_interfaces(ifnames, iftypes, vif, vrrp):
-        interface.operational.reset_counters()
+    Operational.reset_all_counters(
+        [_.ifname for _ in filtered_interfaces(ifnames, iftypes, vif, vrrp)])
 
 
 if __name__ == '__main__':
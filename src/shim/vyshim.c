@@ -26,6 +26,7 @@
 #include <sys/types.h>
 #include <sys/wait.h>
 #include <zmq.h>
+#include <openssl/sha.h>
 #include "mkjson.h"
 
 /*
@@ -61,6 +62,7 @@ volatile int init_alarm = 0;
 volatile int timeout = 0;
 
 int initialization(void *);
+int send_config(void *, const char *, size_t);
 int pass_through(char **, int);
 void timer_handler(int);
 
@@ -195,30 +197,27 @@ int initialization(void* Requester)
     if (timeout) return -1;
 
     FILE *fp_a = popen(GET_ACTIVE, "r");
-    getdelim(&active_str, &active_len, '\0', fp_a);
+    ssize_t active_read = getdelim(&active_str, &active_len, '\0', fp_a);
     int ret = pclose(fp_a);
 
-    if (!ret) {
+    if (!ret && active_read > 0) {
         debug_print("Sending active config\n");
-        zmq_send(Requester, active_str, active_len - 1, 0);
-        zmq_recv(Requester, buffer, 16, 0);
+        send_config(Requester, active_str, active_read);
         debug_print("Received active receipt\n");
     } else {
         debug_print("Sending empty active config\n");
-        zmq_send(Requester, empty_string, 0, 0);
-        zmq_recv(Requester, buffer, 16, 0);
+        send_config(Requester, empty_string, 0);
         debug_print("Received active receipt\n");
     }
 
     free(active_str);
 
     FILE *fp_s = popen(GET_SESSION, "r");
-    getdelim(&session_str, &session_len, '\0', fp_s);
+    ssize_t session_read = getdelim(&session_str, &session_len, '\0', fp_s);
     pclose(fp_s);
 
     debug_print("Sending session config\n");
-    zmq_send(Requester, session_str, session_len - 1, 0);
-    zmq_recv(Requester, buffer, 16, 0);
+    send_config(Requester, session_str, session_read > 0 ? session_read : 0);
     debug_print("Received session receipt\n");
 
     free(session_str);
@@ -232,6 +231,42 @@ int initialization(void* Requester)
     return 0;
 }
 
+/*
+ * Announce a config by the SHA-256 digest of its text first: vyos-configd
+ * keeps the configs of the last commit resident, and only asks for the
+ * full text if it does not know it yet.
+ */
+int send_config(void* Requester, const char *config_str, size_t config_len)
+{
+    unsigned char md[SHA256_DIGEST_LENGTH];
+    char digest[2 * SHA256_DIGEST_LENGTH + 1];
+    char buffer[16];
+
+    SHA256((const unsigned char *)config_str, config_len, md);
+    for (int i = 0; i < SHA256_DIGEST_LENGTH; i++) {
+        sprintf(&digest[2 * i], "%02x", md[i]);
+    }
+
+    char *digest_msg = mkjson(MKJSON_OBJ, 2,
+                              MKJSON_STRING, "type", "digest",
+                              MKJSON_STRING, "digest", &digest[0]);
+
+    zmq_send(Requester, digest_msg, strlen(digest_msg), 0);
+    int len = zmq_recv(Requester, buffer, 16, 0);
+
+    free(digest_msg);
+
+    if (len == 6 && !strncmp(buffer, "cached", 6)) {
+        debug_print("Config is resident in vyos-configd\n");
+        return 0;
+    }
+
+    zmq_send(Requester, config_str, config_len, 0);
+    zmq_recv(Requester, buffer, 16, 0);
+
+    return 0;
+}
+
 int pass_through(char **argv, int end)
 {
     char *newargv[] = { NULL, NULL };
@@ -15,6 +15,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
+import json
 import vyos.configtree
 
 from unittest import TestCase
@@ -54,3 +55,22 @@ class TestConfigParser(TestCase):
     def test_rename_duplicate(self):
         with self.assertRaises(vyos.configtree.ConfigTreeError):
             self.config.rename(["top-level-tag-node", "foo"], "bar")
+
+    def test_bulk_query(self):
+        res = self.config.bulk_query([('exists', ['top-level-valueless-node']),
+                                      ('exists', ['non-existent-node']),
+                                      ('return_value', ['top-level-leaf-node']),
+                                      ('list_nodes', ['top-level-tag-node']),
+                                      ('return_value', ['normal-node', 'option-with-quoted-value']),
+                                      ('return_value', ['non-existent-node'])])
+        self.assertEqual(res, [True, False, 'foo', ['foo', 'bar'], 'some-value', None])
+
+    def test_to_json_subtree(self):
+        full = json.loads(self.config.to_json())
+        for path in [["normal-node"], ["top-level-tag-node", "bar"], ["top-level-leaf-node"]]:
+            expected = full
+            for k in path:
+                expected = expected[k]
+            self.assertEqual(json.loads(self.config.to_json(path)), expected)
+        with self.assertRaises(vyos.configtree.ConfigTreeError):
+            self.config.to_json(["non-existent-node"])
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from copy import deepcopy
+from unittest import TestCase
+
+from vyos.config import Config
+from vyos.configdict import get_removed_vlans
+from vyos.configdict import leaf_node_changed
+from vyos.configdict import node_changed
+from vyos.configdiff import ChangeTrie
+from vyos.configdiff import get_change_trie
+
+EFFECTIVE = {
+    'interfaces': {
+        'ethernet': {
+            'eth0': {
+                'address': ['192.0.2.1/24', '192.0.2.2/24'],
+                'mtu': '1500',
+                'vif': {'10': {}, '20': {'mtu': '1500'}},
+                'vif-s': {'100': {'vif-c': {'1': {}, '2': {}}}},
+            },
+            'eth1': {'mtu': '1500'},
+        },
+    },
+    'system': {'host-name': 'vyos'},
+}
+
+class ConfigDicts(Config):
+    """ A Config answering from a session and an effective config dict """
+    def __init__(self, session, effective):
+        self._level = []
+        self._dict_cache = {False: session, True: effective}
+
+class TestChangeTrie(TestCase):
+    def setUp(self):
+        self.session = deepcopy(EFFECTIVE)
+        eth0 = self.session['interfaces']['ethernet']['eth0']
+        eth0['mtu'] = '9000'
+        eth0['address'].remove('192.0.2.2/24')
+        eth0['description'] = 'foo'
+        del eth0['vif']['10']
+        del self.session['interfaces']['ethernet']['eth1']
+        self.trie = ChangeTrie(self.session, EFFECTIVE)
+
+    def test_unchanged(self):
+        # TestChangeTrie: nodes equal in both dicts are not changed
+        for path in [['system'], ['system', 'host-name'],
+                     ['interfaces', 'ethernet', 'eth0', 'vif', '20'],
+                     ['interfaces', 'ethernet', 'eth0', 'vif-s'],
+                     ['non-existent']]:
+            self.assertFalse(self.trie.changed(path), path)
+        self.assertFalse(ChangeTrie(EFFECTIVE, deepcopy(EFFECTIVE)).changed())
+
+    def test_changed(self):
+        # TestChangeTrie: changed leaf values also change all their parents
+        for path in [[], ['interfaces'], ['interfaces', 'ethernet', 'eth0'],
+                     ['interfaces', 'ethernet', 'eth0', 'mtu'],
+                     ['interfaces', 'ethernet', 'eth0', 'address']]:
+            self.assertTrue(self.trie.changed(path), path)
+        self.assertFalse(self.trie.added(['interfaces', 'ethernet', 'eth0', 'mtu']))
+        self.assertFalse(self.trie.deleted(['interfaces', 'ethernet', 'eth0', 'mtu']))
+
+    def test_added(self):
+        # TestChangeTrie: nodes only in the session dict are added
+        path = ['interfaces', 'ethernet', 'eth0', 'description']
+        self.assertTrue(self.trie.changed(path))
+        self.assertTrue(self.trie.added(path))
+        self.assertFalse(self.trie.deleted(path))
+
+    def test_removed(self):
+        # TestChangeTrie: nodes only in the effective dict, and everything
+        # below them, are deleted
+        for path in [['interfaces', 'ethernet', 'eth1'],
+                     ['interfaces', 'ethernet', 'eth1', 'mtu'],
+                     ['interfaces', 'ethernet', 'eth0', 'vif', '10']]:
+            self.assertTrue(self.trie.changed(path), path)
+            self.assertTrue(self.trie.deleted(path), path)
+            self.assertFalse(self.trie.added(path), path)
+
+    def test_paths(self):
+        # TestChangeTrie: all changes below a path
+        self.assertEqual(sorted(self.trie.paths(['interfaces', 'ethernet', 'eth0'])), [
+            (['interfaces', 'ethernet', 'eth0', 'address'], ChangeTrie.CHANGED),
+            (['interfaces', 'ethernet', 'eth0', 'description'], ChangeTrie.ADDED),
+            (['interfaces', 'ethernet', 'eth0', 'mtu'], ChangeTrie.CHANGED),
+            (['interfaces', 'ethernet', 'eth0', 'vif', '10'], ChangeTrie.DELETED),
+        ])
+        self.assertEqual(self.trie.paths(['system']), [])
+
+    def test_cache(self):
+        # TestChangeTrie: the trie is only built again for other dicts
+        trie = get_change_trie(self.session, EFFECTIVE)
+        self.assertIs(get_change_trie(self.session, EFFECTIVE), trie)
+
+        session = deepcopy(self.session)
+        session['system']['host-name'] = 'foo'
+        other = get_change_trie(session, EFFECTIVE)
+        self.assertIsNot(other, trie)
+        self.assertTrue(other.changed(['system', 'host-name']))
+
+        other = get_change_trie(self.session, deepcopy(self.session))
+        self.assertFalse(other.changed())
+
+class TestConfigDictChanges(TestCase):
+    def setUp(self):
+        self.session = deepcopy(EFFECTIVE)
+
+    def config(self):
+        conf = ConfigDicts(self.session, EFFECTIVE)
+        conf.set_level(['interfaces', 'ethernet', 'eth0'])
+        return conf
+
+    def test_unchanged(self):
+        # TestConfigDictChanges: nothing is reported for unchanged nodes
+        conf = self.config()
+        self.assertIsNone(leaf_node_changed(conf, ['mtu']))
+        self.assertIsNone(leaf_node_changed(conf, ['address']))
+        self.assertEqual(node_changed(conf, ['vif']), [])
+        self.assertEqual(get_removed_vlans(conf, {}), {})
+
+    def test_changed(self):
+        # TestConfigDictChanges: old values and removed nodes are reported
+        eth0 = self.session['interfaces']['ethernet']['eth0']
+        eth0['mtu'] = '9000'
+        eth0['address'] = ['192.0.2.1/24']
+        del eth0['vif']['10']
+        del eth0['vif-s']['100']['vif-c']['2']
+
+        conf = self.config()
+        self.assertEqual(leaf_node_changed(conf, ['mtu']), ['1500'])
+        self.assertEqual(leaf_node_changed(conf, ['address']), ['192.0.2.2/24'])
+        self.assertEqual(node_changed(conf, ['vif']), ['10'])
+        self.assertEqual(get_removed_vlans(conf, {'vif_s': {'100': {}}}), {
+            'vif_remove': ['10'],
+            'vif_s': {'100': {'vif_c_remove': ['2']}},
+        })
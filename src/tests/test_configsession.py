@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import tempfile
+
+from unittest import TestCase
+from unittest.mock import patch
+
+import vyos.configsession
+from vyos.configsession import ConfigSession, ConfigSessionError, apply_commands
+
+# node templates: path -> node.def
+TEMPLATES = {
+    ('interfaces',): '',
+    ('interfaces', 'ethernet'): 'tag:\ntype: txt\n',
+    ('interfaces', 'ethernet', 'node.tag', 'address'): 'multi:\ntype: txt\n',
+    ('interfaces', 'ethernet', 'node.tag', 'description'): 'type: txt\n',
+    ('system',): '',
+    ('system', 'host-name'): 'type: txt\n',
+}
+
+class FakeTree:
+    """ The ConfigTree calls of apply_commands(), on nested dicts """
+    def __init__(self):
+        self.nodes = {}
+        self.tags = set()
+
+    def _node(self, path, create=False):
+        node = self.nodes
+        for name in path:
+            if name not in node and create:
+                node[name] = {}
+            node = node[name]
+        return node
+
+    def set(self, path, value=None, replace=True):
+        if value is None:
+            self._node(path, create=True)
+            return
+        parent = self._node(path[:-1], create=True)
+        if replace or not isinstance(parent.get(path[-1]), list):
+            parent[path[-1]] = []
+        parent[path[-1]].append(value)
+
+    def set_tag(self, path):
+        self.tags.add(tuple(path))
+
+    def exists(self, path):
+        try:
+            self._node(path)
+        except KeyError:
+            return False
+        return True
+
+    def return_values(self, path):
+        return self._node(path)
+
+    def delete(self, path):
+        del self._node(path[:-1])[path[-1]]
+
+    def delete_value(self, path, value):
+        self._node(path).remove(value)
+
+class RecordingSession(ConfigSession):
+    """ A ConfigSession recording the commands instead of running them """
+    def __init__(self):
+        self.argv = []
+
+    def __del__(self):
+        pass
+
+    def _ConfigSession__run_command(self, cmd_list):
+        self.argv.append(cmd_list)
+
+class TestApplyCommands(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        for path, node_def in TEMPLATES.items():
+            node_dir = os.path.join(self.tmp.name, *path)
+            os.makedirs(node_dir)
+            with open(os.path.join(node_dir, 'node.def'), 'w') as f:
+                f.write(node_def)
+        os.makedirs(os.path.join(self.tmp.name, 'interfaces', 'ethernet', 'node.tag'), exist_ok=True)
+        patcher = patch.object(vyos.configsession, 'TEMPLATES', self.tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+
+    def configure(self, commands):
+        """ The my_set/my_delete arguments /configure runs for the commands """
+        session = RecordingSession()
+        for op, path, value in commands:
+            getattr(session, op)(path, value=value)
+        return session.argv
+
+    def configure_bulk(self, commands, tree=None):
+        """ The tree /configure-bulk builds for the commands """
+        tree = tree or FakeTree()
+        apply_commands(tree, [(op, path, value, " ".join(path + [value]).strip())
+                              for op, path, value in commands])
+        return tree
+
+    def test_tag_node_value(self):
+        # TestApplyCommands: a tag node name given as value creates the tag node
+        commands = [('set', ['interfaces', 'ethernet'], 'eth0')]
+        self.assertEqual(self.configure(commands),
+                         [[vyos.configsession.SET, 'interfaces', 'ethernet', 'eth0']])
+        tree = self.configure_bulk(commands)
+        self.assertEqual(tree.nodes, {'interfaces': {'ethernet': {'eth0': {}}}})
+        self.assertEqual(tree.tags, {('interfaces', 'ethernet')})
+
+    def test_leaf_values(self):
+        # TestApplyCommands: leaf values are set, multi node values appended
+        tree = self.configure_bulk([
+            ('set', ['interfaces', 'ethernet', 'eth0', 'address'], '192.0.2.1/24'),
+            ('set', ['interfaces', 'ethernet', 'eth0', 'address', '192.0.2.2/24'], ''),
+            ('set', ['interfaces', 'ethernet', 'eth0', 'address'], '192.0.2.1/24'),
+            ('set', ['interfaces', 'ethernet', 'eth0', 'description'], 'foo'),
+            ('set', ['interfaces', 'ethernet', 'eth0', 'description'], 'bar'),
+            ('set', ['system', 'host-name', 'vyos'], ''),
+        ])
+        self.assertEqual(tree.nodes, {
+            'interfaces': {'ethernet': {'eth0': {
+                'address': ['192.0.2.1/24', '192.0.2.2/24'],
+                'description': ['bar'],
+            }}},
+            'system': {'host-name': ['vyos']},
+        })
+        self.assertEqual(tree.tags, {('interfaces', 'ethernet')})
+
+    def test_delete_tag_node_value(self):
+        # TestApplyCommands: a tag node name given as value deletes the tag node
+        tree = self.configure_bulk([
+            ('set', ['interfaces', 'ethernet', 'eth0', 'description'], 'foo'),
+            ('set', ['interfaces', 'ethernet'], 'eth1'),
+            ('delete', ['interfaces', 'ethernet'], 'eth0'),
+        ])
+        self.assertEqual(tree.nodes, {'interfaces': {'ethernet': {'eth1': {}}}})
+
+    def test_delete_leaf_value(self):
+        # TestApplyCommands: deleting the value of a leaf removes the node
+        tree = self.configure_bulk([
+            ('set', ['interfaces', 'ethernet', 'eth0', 'description'], 'foo'),
+            ('delete', ['interfaces', 'ethernet', 'eth0', 'description'], 'foo'),
+            ('set', ['system', 'host-name'], 'vyos'),
+            ('delete', ['system', 'host-name', 'vyos'], ''),
+        ])
+        self.assertEqual(tree.nodes, {'interfaces': {'ethernet': {'eth0': {}}},
+                                      'system': {}})
+
+    def test_delete_multi_values(self):
+        # TestApplyCommands: deleting the last value of a multi node removes it
+        tree = self.configure_bulk([
+            ('set', ['interfaces', 'ethernet', 'eth0', 'address'], '192.0.2.1/24'),
+            ('set', ['interfaces', 'ethernet', 'eth0', 'address'], '192.0.2.2/24'),
+            ('delete', ['interfaces', 'ethernet', 'eth0', 'address'], '192.0.2.1/24'),
+        ])
+        self.assertEqual(tree.nodes, {'interfaces': {'ethernet': {'eth0': {
+            'address': ['192.0.2.2/24']}}}})
+
+        self.configure_bulk([
+            ('delete', ['interfaces', 'ethernet', 'eth0', 'address', '192.0.2.2/24'], ''),
+        ], tree)
+        self.assertEqual(tree.nodes, {'interfaces': {'ethernet': {'eth0': {}}}})
+
+    def test_delete_missing(self):
+        # TestApplyCommands: deleting what does not exist is an error
+        tree = self.configure_bulk([
+            ('set', ['interfaces', 'ethernet', 'eth0', 'address'], '192.0.2.1/24'),
+        ])
+        for path, value in [(['interfaces', 'ethernet'], 'eth1'),
+                            (['interfaces', 'ethernet', 'eth0', 'address'], '192.0.2.2/24')]:
+            with self.assertRaises(ConfigSessionError):
+                self.configure_bulk([('delete', path, value)], tree)
+
+    def test_invalid_path(self):
+        # TestApplyCommands: paths without a node template are not valid
+        for path, value in [(['interfaces', 'foo'], ''), (['interfaces'], 'foo'),
+                            (['system', 'host-name', 'vyos', 'foo'], '')]:
+            with self.assertRaises(ConfigSessionError):
+                self.configure_bulk([('set', path, value)])
+
+    def test_missing_value(self):
+        # TestApplyCommands: nodes taking a value cannot be set without one
+        for path in [['system', 'host-name'], ['interfaces', 'ethernet'],
+                     ['interfaces', 'ethernet', 'eth0', 'address']]:
+            with self.assertRaises(ConfigSessionError):
+                self.configure_bulk([('set', path, '')])
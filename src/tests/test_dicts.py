@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from copy import deepcopy
+from unittest import TestCase
+from vyos.dicts import CopyOnWriteDict
+
+class TestCopyOnWriteDict(TestCase):
+    def setUp(self):
+        self.source = {
+            'vif': {'10': {'mtu': '1500', 'address': ['192.0.2.1/24']}},
+            'description': 'foo'
+        }
+        self.original = deepcopy(self.source)
+
+    def test_nested_assignment(self):
+        # TestCopyOnWriteDict: Nested modifications do not reach the source
+        d = CopyOnWriteDict(self.source)
+        d['vif']['10']['mtu'] = '9000'
+        d['vif']['10']['address'].append('192.0.2.2/24')
+        self.assertEqual(d['vif']['10']['mtu'], '9000')
+        self.assertEqual(self.source, self.original)
+
+    def test_unaccessed_branch_is_shared(self):
+        # TestCopyOnWriteDict: Branches not walked into are not copied
+        d = CopyOnWriteDict(self.source)
+        self.assertIs(dict.__getitem__(d, 'vif'), self.source['vif'])
+
+    def test_items_and_copy(self):
+        # TestCopyOnWriteDict: items() and copy() hand out private values
+        d = CopyOnWriteDict(self.source)
+        c = d.copy()
+        for _, vif in d['vif'].items():
+            vif['mtu'] = '9000'
+        self.assertEqual(c['vif']['10']['mtu'], '1500')
+        self.assertEqual(self.source, self.original)
+
+    def test_copy_of_accessed_branch(self):
+        # TestCopyOnWriteDict: branches handed out before copy() are not shared
+        d = CopyOnWriteDict({'a': {'b': {'c': '1'}}})
+        x = d['a']
+        x['b']
+        c = d.copy()
+        x['b']['c'] = '2'
+        self.assertEqual(c['a']['b']['c'], '1')
+        c['a']['b']['c'] = '3'
+        self.assertEqual(d['a']['b']['c'], '2')
+
+    def test_plain_dict_conversion(self):
+        # TestCopyOnWriteDict: dict() and ** unpacking do not expose the source
+        d = CopyOnWriteDict(self.source)
+        p = {**d}
+        p['vif']['10']['mtu'] = '9000'
+        self.assertEqual(self.source, self.original)
+
+    def test_pop(self):
+        # TestCopyOnWriteDict: popped values do not alias the source
+        d = CopyOnWriteDict(self.source)
+        vif = d.pop('vif')
+        vif['10']['mtu'] = '9000'
+        self.assertNotIn('vif', d)
+        self.assertEqual(self.source, self.original)
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from unittest import TestCase
+
+from vyos.netlink import rtnl
+from vyos.netlink import IFF_UP
+
+class TestVyOSNetlink(TestCase):
+    def test_get_link(self):
+        link = rtnl.get_link('lo')
+        self.assertEqual(link['ifname'], 'lo')
+        self.assertEqual(link['index'], 1)
+        self.assertTrue(link['flags'] & IFF_UP)
+        with open('/sys/class/net/lo/mtu') as f:
+            self.assertEqual(link['mtu'], int(f.read()))
+
+    def test_get_link_missing(self):
+        with self.assertRaises(OSError):
+            rtnl.get_link('vyos-missing0')